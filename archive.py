@@ -0,0 +1,92 @@
+import asyncio
+import io
+import tarfile
+import threading
+import time
+import zipfile
+from datetime import datetime
+
+from bulk_export import export_items, get_item_date, unique_filename
+
+ARCHIVE_FORMATS = {".zip": "zip", ".tar.gz": "tar.gz", ".tgz": "tar.gz"}
+
+
+def archive_format_for(path):
+    """Returns the archive format matching the file extension of path, or None."""
+    for extension, archive_format in ARCHIVE_FORMATS.items():
+        if str(path).lower().endswith(extension):
+            return archive_format
+    return None
+
+
+class ArchiveWriter:
+    """
+    Writes entries into a ZIP or gzip-compressed tar archive as they arrive.
+
+    Entries are written straight through to the file, so only the entry being added is held
+    in memory. add() is thread-safe and may be called from executor threads.
+    """
+    def __init__(self, file, archive_format="zip"):
+        self.archive_format = archive_format
+        self._lock = threading.Lock()
+        if archive_format == "zip":
+            self._archive = zipfile.ZipFile(file, "w", compression=zipfile.ZIP_DEFLATED)
+        elif archive_format == "tar.gz":
+            if isinstance(file, (str, bytes)) or hasattr(file, '__fspath__'):
+                self._archive = tarfile.open(file, "w:gz")
+            else:
+                self._archive = tarfile.open(fileobj=file, mode="w:gz")
+        else:
+            raise ValueError(f"Unsupported archive format: {archive_format}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def add(self, name, data, modified=None):
+        """Adds an entry with the given bytes, `modified` being a datetime used as its timestamp."""
+        timestamp = modified.timestamp() if modified else time.time()
+        with self._lock:
+            if self.archive_format == "zip":
+                date_time = time.localtime(max(timestamp, 315532800))[:6] # ZIP cannot store dates before 1980
+                info = zipfile.ZipInfo(name, date_time=date_time)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                self._archive.writestr(info, data)
+            else:
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = int(timestamp)
+                self._archive.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        with self._lock:
+            self._archive.close()
+
+
+def item_datetime(item):
+    try:
+        return datetime.fromisoformat(get_item_date(item).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+async def export_archive(client, archive, items, mode, prefix="", jobs=4, on_progress=None, executor=None,
+                         tolerance=None, export_format="gpx"):
+    """
+    Downloads all items as entries of `export_format` into an open ArchiveWriter.
+
+    Uses the export_items pipeline, so at most `jobs` tracks are in memory at once. Entry names
+    come from unique_filename() in listing order, optionally below `prefix` (e.g. "tracks/").
+    Returns a tuple of (entry_names, failures).
+    """
+    def path_for(item, used, extension):
+        return prefix + unique_filename(item.get('name', 'Unnamed'), mode, used, extension)
+
+    async def save(client, item, mode, name, writer):
+        data = await writer.encode(await client.get_track(item, mode))
+        await asyncio.to_thread(archive.add, name, data, item_datetime(item))
+
+    return await export_items(client, items, mode, jobs=jobs, on_progress=on_progress, path_for=path_for,
+                              save=save, executor=executor, tolerance=tolerance, export_format=export_format)
@@ -0,0 +1,154 @@
+"""
+Offline benchmarks for blob decoding, GPX and other export formats, simplification and filename sanitizing.
+
+Usage:
+    python benchmarks/bench_conversion.py [--sizes 1000 10000 100000 1000000] [--output results.json]
+    python benchmarks/bench_conversion.py --compare baseline.json --output current.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calimoto_client import CalimotoClient
+from exporters import available_formats, export_bytes, iter_gpx
+from simplify import simplify_track
+from json_stream import ArrayStreamParser
+from track import Track
+from fixtures import START_DATE, make_names, make_track
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+CHUNK_SIZE = 65536 # Typical size of the chunks a streamed download delivers
+
+
+def decode_blobs(encoded):
+    # Mirrors CalimotoClient._get_blob: stream each blob chunk by chunk into compact arrays
+    blobs = {}
+    for key, payload in encoded.items():
+        parser = ArrayStreamParser(key, pairs=key == "points")
+        for start in range(0, len(payload), CHUNK_SIZE):
+            parser.feed(payload[start:start + CHUNK_SIZE])
+        blobs[key] = parser.close()
+    return blobs
+
+
+def benchmark_cases(size):
+    """Yields (name, unit count, function) for every benchmark at the given size."""
+    track = make_track(size)
+    encoded = {key: json.dumps({key: values}).encode('utf-8') for key, values in track.items()}
+    route = Track.from_points(track["points"], "Benchmark")
+    recorded = Track.from_points(track["points"], "Benchmark", track["altitudes"], track["dates"], track["speeds"], START_DATE)
+    names = make_names(size)
+
+    yield "decode_blobs", size, lambda: decode_blobs(encoded)
+    yield "build_track", size, lambda: Track.from_points(track["points"], "Benchmark", track["altitudes"],
+                                                         track["dates"], track["speeds"], START_DATE)
+    yield "convert_route", size, lambda: "".join(iter_gpx(route))
+    yield "convert_track", size, lambda: "".join(iter_gpx(recorded))
+    yield "write_track", size, lambda: export_bytes(recorded)
+    yield "simplify_track", size, lambda: simplify_track(recorded, 5)
+    for export_format in available_formats():
+        if export_format != "gpx": # Covered by write_track
+            yield f"export_{export_format}", size, lambda export_format=export_format: export_bytes(recorded, export_format)
+    yield "sanitize_filename", size, lambda: [CalimotoClient.sanitize_filename(name) for name in names]
+
+
+def output_size(result):
+    if isinstance(result, str):
+        return len(result.encode('utf-8'))
+    if isinstance(result, bytes):
+        return len(result)
+    return None
+
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+        size = output_size(result)
+        del result
+
+    # Peak memory is measured in a separate run, tracemalloc slows down the timed ones
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak, size
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run(sizes, repeat, only=None):
+    results = []
+    for size in sizes:
+        for name, units, function in benchmark_cases(size):
+            if only and name not in only:
+                continue
+            seconds, peak, out_bytes = measure(function, repeat)
+            results.append({
+                "benchmark": name,
+                "size": size,
+                "seconds": seconds,
+                "throughput": units / seconds if seconds else None,
+                "peak_memory_bytes": peak,
+                "output_bytes": out_bytes,
+            })
+            print(f"{name:<18} {size:>8} {seconds * 1000:>10.1f} ms {units / seconds:>14,.0f}/s "
+                  f"{peak / 1e6:>9.1f} MB peak" + (f" {out_bytes / 1e6:>9.1f} MB out" if out_bytes else ""))
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(baseline, current):
+    previous = {(r["benchmark"], r["size"]): r for r in baseline["results"]}
+    print(f"\nCompared to {baseline.get('revision') or 'baseline'}:")
+    for result in current["results"]:
+        old = previous.get((result["benchmark"], result["size"]))
+        if not old:
+            continue
+        speedup = old["seconds"] / result["seconds"]
+        memory = result["peak_memory_bytes"] / old["peak_memory_bytes"] if old["peak_memory_bytes"] else 1
+        print(f"{result['benchmark']:<18} {result['size']:>8} {speedup:>6.2f}x speed {memory:>6.2f}x memory")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Track sizes in points")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark, the best one is reported")
+    parser.add_argument("--only", nargs="+", help="Only run the named benchmarks")
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.repeat, args.only)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
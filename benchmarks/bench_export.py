@@ -0,0 +1,89 @@
+"""
+End-to-end throughput benchmark of login, listing and bulk export against FakeCalimoto.
+
+Usage:
+    python benchmarks/bench_export.py --tracks 3000 --points 2000 --latency 0.05 --jobs 1 4 16 [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calimoto_client import CalimotoClient, EXPORT_KEYS
+from bulk_export import export_items, make_executor
+from fake_calimoto import FakeCalimoto
+
+
+def make_client(fake):
+    client = CalimotoClient(keys_cache_file=None, base_url=fake.base_url, parse_url=fake.parse_url,
+                            transport=fake.transport())
+    client.set_credentials("bench@example.com", "secret")
+    return client
+
+
+async def run_once(fake, mode, jobs, workers):
+    async with make_client(fake) as client:
+        start = time.perf_counter()
+        await client.login()
+        login_seconds = time.perf_counter() - start
+
+        with tempfile.TemporaryDirectory() as out_dir:
+            start = time.perf_counter()
+            executor = make_executor(workers)
+            try:
+                saved, failures = await export_items(client, client.iter_items(mode, keys=EXPORT_KEYS), mode, out_dir,
+                                                     jobs, executor=executor)
+            finally:
+                if executor:
+                    executor.shutdown()
+            export_seconds = time.perf_counter() - start
+            output_bytes = sum(os.path.getsize(path) for path in saved)
+
+    return {
+        "jobs": jobs,
+        "workers": workers,
+        "login_seconds": login_seconds,
+        "export_seconds": export_seconds,
+        "items": len(saved),
+        "failures": len(failures),
+        "items_per_second": len(saved) / export_seconds if export_seconds else None,
+        "output_bytes": output_bytes,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["routes", "tracks"], default="tracks")
+    parser.add_argument("--routes", type=int, default=200)
+    parser.add_argument("--tracks", type=int, default=200)
+    parser.add_argument("--points", type=int, default=1000, help="Points per item")
+    parser.add_argument("--latency", type=float, default=0.02, help="Simulated latency per request in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--workers", type=int, default=0, help="Conversion processes, 0 converts on the event loop")
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for jobs in args.jobs:
+        fake = FakeCalimoto(routes=args.routes, tracks=args.tracks, points_per_item=args.points,
+                            latency=args.latency, error_rate=args.error_rate)
+        result = await run_once(fake, args.mode, jobs, args.workers)
+        result["requests"] = sum(fake.requests.values())
+        result["bytes_served"] = fake.bytes_sent
+        results.append(result)
+        print(f"jobs={jobs:<3} workers={args.workers:<2} login {result['login_seconds']:.2f}s  export {result['export_seconds']:.2f}s  "
+              f"{result['items_per_second']:.1f} items/s  {result['failures']} failed  {result['requests']} requests")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
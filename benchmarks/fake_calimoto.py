@@ -0,0 +1,205 @@
+"""
+A local stand-in for calimoto.com, the Parse server and its file store.
+
+FakeCalimoto serves the trip-planner page and script bundles, /parse/login,
+/parse/classes/tblRoutes|tblTracks and the points/altitudes/dates/speeds blobs through an
+httpx transport, so CalimotoClient can be load tested without touching production:
+
+    fake = FakeCalimoto(tracks=3000, points_per_item=5000, latency=0.05, error_rate=0.01)
+    client = CalimotoClient(keys_cache_file=None, base_url=fake.base_url,
+                            parse_url=fake.parse_url, transport=fake.transport())
+"""
+import asyncio
+import json
+import random
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from fixtures import make_track
+
+APP_ID = "fake-app-id"
+JS_KEY = "fake-javascript-key"
+BLOB_KEYS = ["points", "altitudes", "dates", "speeds"]
+BLOB_CHUNK_SIZE = 16384
+TRACK_VARIANTS = 8 # Distinct blob payloads shared by all items, keeps the server's memory small
+
+
+class FakeCalimoto:
+    def __init__(self, routes=100, tracks=100, points_per_item=1000, latency=0.0, error_rate=0.0,
+                 script_size=500_000, seed=0):
+        self.base_url = "https://calimoto.test"
+        self.parse_url = "https://parse.calimoto.test/parse"
+        self.files_url = "https://files.calimoto.test"
+        self.latency = latency
+        self.error_rate = error_rate
+        self.script_size = script_size
+        self.random = random.Random(seed)
+        self.requests = Counter()
+        self.bytes_sent = 0
+        self.user_id = "fakeUser01"
+        self.session_token = "r:fake-session"
+        self.rows = {
+            "tblRoutes": self._make_rows("routes", routes),
+            "tblTracks": self._make_rows("tracks", tracks),
+        }
+        self.blobs = {}
+        self.points_per_item = points_per_item
+
+    def _make_rows(self, mode, count):
+        created = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        rows = []
+        for index in range(count):
+            timestamp = created + timedelta(hours=index)
+            iso = timestamp.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+            object_id = f"{mode[0].upper()}{index:09d}"
+            row = {
+                "objectId": object_id,
+                "userId": self.user_id,
+                "name": f"{mode[:-1].title()} {index % 500}", # Duplicate names on purpose
+                "distance": 10_000 + index,
+                "createdAt": iso,
+                "updatedAt": iso,
+                "timeCreated": {"__type": "Date", "iso": iso},
+                "pictures": [{"__type": "Pointer", "className": "tblPictures", "objectId": f"P{index}"}],
+            }
+            keys = BLOB_KEYS if mode == "tracks" else ["points"]
+            for key in keys:
+                variant = index % TRACK_VARIANTS
+                row[key] = {"__type": "File", "name": f"{key}.json", "url": f"{self.files_url}/{key}/{variant}/{object_id}"}
+            rows.append(row)
+        return rows
+
+    def transport(self):
+        return httpx.MockTransport(self.handle)
+
+    async def handle(self, request):
+        self.requests[f"{request.method} {request.url.host}{request.url.path}"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and self.random.random() < self.error_rate:
+            return self._respond(503, {"error": "Service unavailable"}, headers={"Retry-After": "1"})
+
+        url = str(request.url)
+        if url.startswith(self.files_url):
+            return self._blob(request)
+        if url.startswith(self.parse_url):
+            return self._parse(request)
+        if url.startswith(self.base_url):
+            return self._website(request)
+        return self._respond(404, {"error": "Not found"})
+
+    def _respond(self, status, data=None, content=None, headers=None):
+        if content is None:
+            content = json.dumps(data).encode("utf-8")
+        self.bytes_sent += len(content)
+        return httpx.Response(status, content=content, headers=headers)
+
+    def _website(self, request):
+        path = request.url.path
+        if path == "/en/motorcycle-trip-planner":
+            html = ('<html><head><script src="/static/js/vendor.chunk.js"></script>'
+                    '<script src="https://cdn.example.com/analytics.js"></script>'
+                    '<script src="/static/js/main.chunk.js"></script></head></html>')
+            return self._respond(200, content=html.encode("utf-8"))
+        if path == "/static/js/vendor.chunk.js":
+            return self._respond(200, content=b"var a=1;" * (self.script_size // 8))
+        if path == "/static/js/main.chunk.js":
+            filler = b"function f(){}" * (self.script_size // 28)
+            config = f'Parse.initialize({{appId:"{APP_ID}",key:"{JS_KEY}"}});'.encode("utf-8")
+            return self._respond(200, content=filler + config + filler)
+        return self._respond(404, {"error": "Not found"})
+
+    def _parse(self, request):
+        path = request.url.path
+        body = json.loads(request.content or b"{}")
+        if body.get("_ApplicationId") != APP_ID or body.get("_JavaScriptKey") != JS_KEY:
+            return self._respond(403, {"error": "unauthorized"})
+
+        if path.endswith("/login"):
+            return self._respond(200, {"objectId": self.user_id, "sessionToken": self.session_token})
+
+        class_name = path.rsplit("/", 1)[-1]
+        if class_name not in self.rows:
+            return self._respond(404, {"code": 119, "error": "Unknown class"})
+        if body.get("_SessionToken") != self.session_token:
+            return self._respond(400, {"code": 209, "error": "Invalid session token"})
+        if body.get("count"):
+            return self._respond(200, {"results": self._query(class_name, body), "count": self._count(class_name, body)})
+        return self._respond(200, {"results": self._query(class_name, body)})
+
+    def _filter(self, class_name, body):
+        return [row for row in self.rows[class_name] if self._matches_where(row, body.get("where") or {})]
+
+    def _matches_where(self, row, where):
+        for field, constraint in where.items():
+            if field == "$or":
+                if not any(self._matches_where(row, clause) for clause in constraint):
+                    return False
+            elif not self._matches(row.get(field), constraint):
+                return False
+        return True
+
+    def _count(self, class_name, body):
+        return len(self._filter(class_name, body))
+
+    def _query(self, class_name, body):
+        rows = self._filter(class_name, body)
+        # Sort by the last key first, so the stable sorts leave the first key in charge
+        for key in reversed((body.get("order") or "").split(",")):
+            if key:
+                rows = sorted(rows, key=lambda row: row[key.lstrip("-")], reverse=key.startswith("-"))
+        skip = body.get("skip", 0)
+        rows = rows[skip:skip + body.get("limit", 100)]
+
+        keys = body.get("keys")
+        if keys:
+            wanted = set(keys.split(",")) | {"objectId", "createdAt", "updatedAt"}
+            rows = [{key: value for key, value in row.items() if key in wanted} for row in rows]
+        if "pictures" not in (body.get("include") or ""):
+            # Without the join, pointers stay pointers; with it the fake expands them into full objects
+            return rows
+        return [
+            {**row, "pictures": [{**picture, "__type": "Object", "url": f"{self.files_url}/pictures/{picture['objectId']}.jpg",
+                                  "width": 1920, "height": 1080} for picture in row.get("pictures", [])]}
+            for row in rows
+        ]
+
+    @staticmethod
+    def _matches(value, constraint):
+        if isinstance(constraint, dict) and constraint.get("__type") == "Date":
+            return value == constraint["iso"]
+        if not isinstance(constraint, dict):
+            return value == constraint
+        for operator, operand in constraint.items():
+            if isinstance(operand, dict) and operand.get("__type") == "Date":
+                operand = operand["iso"]
+            if operator == "$gt" and not (value is not None and value > operand):
+                return False
+            if operator == "$gte" and not (value is not None and value >= operand):
+                return False
+            if operator == "$lt" and not (value is not None and value < operand):
+                return False
+            if operator == "$lte" and not (value is not None and value <= operand):
+                return False
+        return True
+
+    def _blob(self, request):
+        parts = request.url.path.strip("/").split("/")
+        if len(parts) != 3 or parts[0] not in BLOB_KEYS:
+            return self._respond(404, {"error": "Not found"})
+        key, variant = parts[0], int(parts[1])
+        if (key, variant) not in self.blobs:
+            track = make_track(self.points_per_item, seed=variant)
+            self.blobs[(key, variant)] = json.dumps({key: track[key]}).encode("utf-8")
+        content = self.blobs[(key, variant)]
+        self.bytes_sent += len(content)
+
+        async def chunks():
+            # Delivered in pieces like a real download, so streaming and progress reporting get exercised
+            for start in range(0, len(content), BLOB_CHUNK_SIZE):
+                yield content[start:start + BLOB_CHUNK_SIZE]
+
+        return httpx.Response(200, content=chunks(),
+                              headers={"Content-Type": "application/json", "Content-Length": str(len(content))})
@@ -0,0 +1,38 @@
+import random
+from datetime import datetime, timezone
+
+START_DATE = datetime(2024, 6, 1, 8, 30, 0, tzinfo=timezone.utc)
+
+
+def make_track(size, seed=0):
+    """
+    Returns synthetic blob payloads shaped like the Parse files of a recorded track.
+
+    The result maps "points", "altitudes", "dates" and "speeds" to the lists stored in the
+    corresponding blobs: a ride starting near Munich sampled roughly once per second.
+    """
+    rng = random.Random(seed)
+    lat, lon, ele = 48.137154, 11.576124, 520.0
+    offset = 0
+    points, altitudes, dates, speeds = [], [], [], []
+    for _ in range(size):
+        lat += rng.uniform(-0.0002, 0.0002)
+        lon += rng.uniform(-0.0002, 0.0003)
+        ele = max(0.0, ele + rng.uniform(-1.5, 1.5))
+        offset += rng.randint(900, 1100)
+        points.append([round(lat, 7), round(lon, 7)])
+        altitudes.append(round(ele, 1))
+        dates.append(offset)
+        speeds.append(round(rng.uniform(0, 35), 2))
+    return {"points": points, "altitudes": altitudes, "dates": dates, "speeds": speeds}
+
+
+def make_names(count, seed=0):
+    """Returns route names mixing arrows, spaces, slashes and non-printable characters."""
+    rng = random.Random(seed)
+    words = ["Alpen", "Tour", "Passo dello Stelvio", "Runde/Nord", "Café", "Rückweg", "  ", "\t"]
+    separators = [" → ", " ⇄ ", " - ", "\\", "_", " "]
+    return [
+        "".join(rng.choice(words) + rng.choice(separators) for _ in range(rng.randint(1, 4)))
+        for _ in range(count)
+    ]
@@ -0,0 +1,117 @@
+import hashlib
+import os
+import threading
+import zlib
+
+BLOB_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'calimoto_exporter', 'blobs')
+BLOB_CACHE_MAX_BYTES = 512 * 1024 * 1024
+COMPRESSION_LEVEL = 1 # Blobs are JSON number arrays, even the fastest level shrinks them several times
+
+
+class BlobCache:
+    """
+    On-disk cache of Parse file contents, keyed by file URL.
+
+    Parse file URLs are immutable per upload, so entries never need revalidation. Files are
+    stored under the SHA-256 of their URL, optionally zlib compressed, and the least recently
+    used ones are evicted once the cache grows beyond max_bytes.
+    """
+    def __init__(self, directory=BLOB_CACHE_DIR, max_bytes=BLOB_CACHE_MAX_BYTES, compress=True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.hits = 0
+        self.misses = 0
+        self._size = None # Total size on disk, computed on first write
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url, compressed):
+        name = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, name + ('.z' if compressed else ''))
+
+    def get(self, url):
+        """Returns the cached content of url, or None."""
+        for compressed in (self.compress, not self.compress):
+            path = self._path(url, compressed)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                os.utime(path) # Mark as recently used
+            except OSError:
+                continue
+            try:
+                content = zlib.decompress(data) if compressed else data
+            except zlib.error:
+                self._remove(path) # Corrupt entry, refetch
+                continue
+            self.hits += 1
+            return content
+        self.misses += 1
+        return None
+
+    def compressor(self):
+        """Returns a zlib compressor to encode streamed content for put(..., encoded=True), or None."""
+        return zlib.compressobj(COMPRESSION_LEVEL) if self.compress else None
+
+    def put(self, url, content, encoded=False):
+        """Stores content, `encoded` meaning it was already compressed with compressor()."""
+        data = zlib.compress(content, COMPRESSION_LEVEL) if self.compress and not encoded else content
+        path = self._path(url, self.compress)
+        # Write to a temporary file first so concurrent readers never see a partial entry
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+            return # Caching is best effort
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._disk_usage()
+            else:
+                self._size += len(data) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        """Yields (mtime, size, path) of the cached files, skipping the in-flight writes of other threads."""
+        for entry in os.scandir(self.directory):
+            if not entry.is_file() or entry.name.endswith('.tmp'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue # Replaced or evicted by another thread meanwhile
+            yield stat.st_mtime, stat.st_size, entry.path
+
+    def _disk_usage(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        # Drop least recently used entries until there is some headroom again
+        entries = sorted(self._entries())
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if self._size <= target:
+                break
+            if self._remove(path):
+                self._size -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def clear(self):
+        with self._lock:
+            for entry in os.scandir(self.directory):
+                if entry.is_file():
+                    self._remove(entry.path)
+            self._size = 0
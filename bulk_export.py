@@ -0,0 +1,147 @@
+import asyncio
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from calimoto_client import CalimotoClient
+from exporters import export_bytes, export_file, get_exporter
+
+
+def get_item_date(item):
+    return item.get('createdAt') or item.get('timeCreated', {}).get('iso') or ""
+
+
+def unique_filename(name, mode, used, extension="gpx"):
+    """Returns a filename for the item name that is not yet in `used` and records it."""
+    safe_name = CalimotoClient.sanitize_filename(name) or "Unnamed"
+    base = f"{safe_name}_{mode[:-1]}"
+    filename = f"{base}.{extension}"
+    counter = 2
+    while filename.lower() in used:
+        filename = f"{base}_{counter}.{extension}"
+        counter += 1
+    used.add(filename.lower())
+    return filename
+
+
+async def _iter_items(items):
+    if hasattr(items, '__aiter__'):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+def make_executor(workers):
+    """
+    Returns an executor for the CPU-bound track conversion, or None to convert on the event loop.
+
+    Threads only help on a free-threaded Python build, otherwise processes are used so
+    conversions run on all cores without stalling the downloads.
+    """
+    if not workers or workers < 1:
+        return None
+    gil_enabled = getattr(sys, '_is_gil_enabled', lambda: True)()
+    return ProcessPoolExecutor(workers) if gil_enabled else ThreadPoolExecutor(workers)
+
+
+async def convert(executor, function, *args):
+    """Runs a conversion function in the executor, or inline if there is none."""
+    if executor is None:
+        return function(*args)
+    return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+
+
+class TrackWriter:
+    """Encodes Tracks in one export format (see exporters.py), in the executor if one is given."""
+    def __init__(self, export_format="gpx", tolerance=None, executor=None):
+        self.extension = get_exporter(export_format).extension # Fails early for unknown formats
+        self.export_format = export_format
+        self.tolerance = tolerance
+        self.executor = executor
+
+    async def encode(self, track):
+        return await convert(self.executor, export_bytes, track, self.export_format, self.tolerance)
+
+    async def write(self, track, path):
+        await convert(self.executor, export_file, track, path, self.export_format, self.tolerance)
+
+
+async def save_track(client, item, mode, path, writer):
+    await writer.write(await client.get_track(item, mode), path)
+
+
+async def export_items(client, items, mode, out_dir=".", jobs=4, on_progress=None, path_for=None, save=save_track,
+                       executor=None, tolerance=None, export_format="gpx"):
+    """
+    Downloads all items as files of `export_format` into out_dir using a bounded pool of workers.
+
+    `items` may be a list or an async iterator such as CalimotoClient.iter_items(), in which
+    case downloads start while later pages are still loading. All workers share the client's
+    httpx.AsyncClient, so at most `jobs` downloads are in flight. A failing item is reported
+    and skipped, it never aborts the batch.
+
+    `path_for(item, used, extension)` may override the filename choice and
+    `save(client, item, mode, path, writer)` what is done per item, with `writer` a TrackWriter for
+    the format. The defaults write one file per item. With an executor (see make_executor) the
+    conversion runs there: while some workers convert, the others keep downloading, so `jobs`
+    should be larger than the executor's worker count. A `tolerance` in metres simplifies every
+    track before conversion (see simplify.py).
+    Returns a tuple of (saved_paths, failures) where failures is a list of (item, error).
+    """
+    writer = TrackWriter(export_format, tolerance, executor)
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = max(1, jobs)
+
+    # Bounded, so a fast listing never runs far ahead of the downloads
+    queue = asyncio.Queue(maxsize=jobs * 2)
+    total = None
+    saved = []
+    failures = []
+
+    def report(item, path, error=None):
+        if on_progress:
+            on_progress(len(saved) + len(failures), total, item, path, error)
+
+    async def producer():
+        nonlocal total
+        # Filenames are assigned in listing order so collisions are resolved deterministically,
+        # independent of the order in which downloads complete.
+        used = set()
+        count = 0
+        try:
+            async for item in _iter_items(items):
+                if path_for:
+                    path = path_for(item, used, writer.extension)
+                else:
+                    path = os.path.join(out_dir, unique_filename(item.get('name', 'Unnamed'), mode, used, writer.extension))
+                await queue.put((item, path))
+                count += 1
+            total = count
+        finally:
+            for _ in range(jobs):
+                await queue.put(None)
+
+    async def worker():
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                return
+            item, path = entry
+            try:
+                await save(client, item, mode, path, writer)
+                saved.append(path)
+                report(item, path)
+            except Exception as e:
+                failures.append((item, e))
+                report(item, path, e)
+
+    tasks = [asyncio.create_task(producer())] + [asyncio.create_task(worker()) for _ in range(jobs)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return saved, failures
@@ -1,17 +1,54 @@
 import asyncio
+import importlib.util
+import inspect
 import json
 import re
 import os
+import time
 import uuid
 import httpx
-from datetime import datetime, timedelta
+from datetime import datetime
+
+from exporters import export_bytes
+from json_stream import ArrayStreamParser
+from request_scheduler import RETRY_STATUSES, RequestScheduler, RetryableStatusError
+from track import Track
+
+try:
+    import orjson
+except ImportError:
+    orjson = None # Optional, decodes large listings several times faster than json
 
 # Configuration
 CREDENTIALS_FILE = '.credentials'
+BASE_URL = 'https://calimoto.com'
+PARSE_URL = 'https://parse-server.prod.calimoto.com/parse'
+SESSION_FILE = os.path.join(os.path.expanduser('~'), '.calimoto_exporter_token')
+KEYS_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.calimoto_exporter_keys')
+KEYS_CACHE_TTL = 7 * 24 * 60 * 60 # Re-scrape the Parse keys at least once a week
+KEYS_REGEX = re.compile(r"appId\s*:\s*['\"]([^'\"]+)['\"]\s*,\s*key\s*:\s*['\"]([^'\"]+)['\"]")
+KEYS_SCAN_OVERLAP = 1024 # Characters carried over between chunks when scanning scripts
+SCRIPT_SCAN_CONCURRENCY = 4
+PAGE_SIZE = 500 # Items per listing request
+BLOB_FEED_SIZE = 65536 # Bytes of cached blob content handed to the parser at a time, like a streamed download
+# Columns needed to list items, and additionally to export them without fetching the full row
+SUMMARY_KEYS = ["name", "distance", "timeCreated"]
+EXPORT_KEYS = SUMMARY_KEYS + ["points", "altitudes", "dates", "speeds"]
+# Connection pool, shared by the Parse server and the file host
+MAX_CONNECTIONS = 32
+MAX_KEEPALIVE_CONNECTIONS = 16
+KEEPALIVE_EXPIRY = 60.0 # Seconds an idle connection is kept for reuse
+TIMEOUT = httpx.Timeout(30.0, connect=10.0, pool=None) # The scheduler bounds requests, never time out waiting for the pool
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36'
 
+def _decode_json(content):
+    return orjson.loads(content) if orjson else json.loads(content)
+
+
 class CalimotoClient:
-    def __init__(self):
+    def __init__(self, keys_cache_file=KEYS_CACHE_FILE, base_url=BASE_URL, parse_url=PARSE_URL, transport=None,
+                 scheduler=None, max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                 keepalive_expiry=KEEPALIVE_EXPIRY, http2=False, timeout=TIMEOUT, blob_cache=None):
         self.email = None
         self.password = None
         self.app_id = None
@@ -19,7 +56,25 @@ class CalimotoClient:
         self.session_token = None
         self.user_id = None
         self.installation_id = None
-        self.client = httpx.AsyncClient(headers={'User-Agent': USER_AGENT}, follow_redirects=True)
+        self.keys_cache_file = keys_cache_file
+        self.keys_from_cache = False
+        # base_url/parse_url and transport allow pointing the client at a local stand-in
+        self.base_url = base_url
+        self.parse_url = parse_url
+        # HTTP/2 needs the optional h2 package (pip install httpx[http2]), fall back to HTTP/1.1 without it
+        self.http2 = http2 and importlib.util.find_spec('h2') is not None
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections,
+                              keepalive_expiry=keepalive_expiry)
+        self.client = httpx.AsyncClient(headers={'User-Agent': USER_AGENT}, follow_redirects=True, transport=transport,
+                                        limits=limits, http2=self.http2, timeout=timeout)
+        # Shared by all requests: retries with backoff and adapts the number of requests in flight
+        self.scheduler = scheduler or RequestScheduler(max_concurrency=max_connections)
+        self.stats = {'requests': 0, 'connections': 0, 'http2_requests': 0}
+        # Called with export_session() whenever login produced a new session, e.g. to persist it
+        self.on_session_change = None
+        self._login_lock = asyncio.Lock()
+        # Optional BlobCache consulted before downloading points/altitudes/dates/speeds files
+        self.blob_cache = blob_cache
 
     async def __aenter__(self):
         return self
@@ -28,6 +83,24 @@ class CalimotoClient:
         if self.client:
             await self.client.aclose()
 
+    async def _trace(self, event_name, info):
+        # httpcore trace hook, counts new connections vs. requests sent
+        if event_name == 'connection.connect_tcp.complete':
+            self.stats['connections'] += 1
+        elif event_name == 'http11.send_request_headers.started':
+            self.stats['requests'] += 1
+        elif event_name == 'http2.send_request_headers.started':
+            self.stats['requests'] += 1
+            self.stats['http2_requests'] += 1
+
+    def connection_stats(self):
+        """Returns request and connection counts, `reused` being requests sent over an existing connection."""
+        return {**self.stats, 'reused': max(0, self.stats['requests'] - self.stats['connections'])}
+
+    async def _request(self, method, url, **kwargs):
+        kwargs.setdefault('extensions', {'trace': self._trace})
+        return await self.scheduler.request(lambda: self.client.request(method, url, **kwargs))
+
     def load_credentials_from_env_or_file(self):
         """Loads credentials, returning True if found, False otherwise."""
         self.email = os.environ.get('CALIMOTO_USERNAME')
@@ -49,18 +122,115 @@ class CalimotoClient:
         self.email = email
         self.password = password
 
+    def export_session(self):
+        return {
+            'email': self.email,
+            'session_token': self.session_token,
+            'user_id': self.user_id,
+            'installation_id': self.installation_id,
+        }
+
+    def restore_session(self, data):
+        """Restores a session saved with export_session(), returning True if it belongs to the current user."""
+        if not data or not data.get('session_token') or not data.get('user_id'):
+            return False
+        if self.email and data.get('email') != self.email:
+            return False
+        self.email = data.get('email') or self.email
+        self.session_token = data['session_token']
+        self.user_id = data['user_id']
+        self.installation_id = data.get('installation_id') or self.installation_id
+        return True
+
+    def load_session_from_file(self, path=SESSION_FILE):
+        """Restores a session persisted with save_session_to_file(), returning True if one was found."""
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, 'r') as f:
+                return self.restore_session(json.load(f))
+        except Exception:
+            return False # Unreadable session file, log in again
+
+    def save_session_to_file(self, path=SESSION_FILE):
+        # The session token grants account access, so keep the file private to the user
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.export_session(), f)
+            return True
+        except Exception:
+            return False # Persisting is best effort, the next run just logs in again
+
+    async def ensure_session(self):
+        """
+        Makes the client ready for requests, logging in only if no session was restored.
+
+        A restored session is not validated here: the first request that gets an invalid
+        session error (209) logs in again transparently.
+        """
+        if self.session_token and self.user_id:
+            if await self.initialize():
+                return True
+        return await self.login()
+
     async def initialize(self):
-        return await self._extract_keys()
+        if self.app_id and self.js_key:
+            return True
+        if self._load_cached_keys():
+            return True
+        if await self._extract_keys():
+            self._save_cached_keys()
+            return True
+        return False
+
+    def _load_cached_keys(self):
+        """Loads the Parse keys from the on-disk cache, returning True if a fresh entry was found."""
+        if not self.keys_cache_file or not os.path.exists(self.keys_cache_file):
+            return False
+        try:
+            with open(self.keys_cache_file, 'r') as f:
+                data = json.load(f)
+            if time.time() - data.get('fetched_at', 0) > KEYS_CACHE_TTL:
+                return False
+            if data.get('app_id') and data.get('js_key'):
+                self.app_id = data['app_id']
+                self.js_key = data['js_key']
+                self.keys_from_cache = True
+                return True
+        except Exception:
+            pass # Corrupt cache, fall back to scraping
+        return False
+
+    def _save_cached_keys(self):
+        if not self.keys_cache_file:
+            return
+        try:
+            with open(self.keys_cache_file, 'w') as f:
+                json.dump({'app_id': self.app_id, 'js_key': self.js_key, 'fetched_at': time.time()}, f)
+        except Exception:
+            pass # Caching is best effort
+
+    def invalidate_cached_keys(self):
+        """Drops the current Parse keys and their cache entry so the next initialize() re-scrapes them."""
+        self.app_id = None
+        self.js_key = None
+        self.keys_from_cache = False
+        if self.keys_cache_file and os.path.exists(self.keys_cache_file):
+            try:
+                os.remove(self.keys_cache_file)
+            except Exception:
+                pass
 
     async def _extract_keys(self):
         if self.app_id and self.js_key:
             return True
 
-        base_url = "https://calimoto.com"
+        base_url = self.base_url
         start_url = f"{base_url}/en/motorcycle-trip-planner"
         
         try:
-            response = await self.client.get(start_url)
+            response = await self._request('GET', start_url)
             if response.status_code != 200:
                 raise Exception(f"Failed to load homepage: {response.status_code}")
             html = response.text
@@ -68,50 +238,90 @@ class CalimotoClient:
             script_urls = re.findall(r'<script[^>]+src=["\']([^"\']+)["\']', html)
             target_scripts = [s for s in script_urls if s.startswith('/') or s.startswith(base_url)]
             target_scripts = [s if s.startswith('http') else base_url + s for s in target_scripts]
-            target_scripts = list(set(target_scripts))
-            
-            found = False
-            
+            # Deduplicate while keeping page order, then scan the likely bundles first
+            target_scripts = list(dict.fromkeys(target_scripts))
+            target_scripts.sort(key=self._script_priority)
+
+            semaphore = asyncio.Semaphore(SCRIPT_SCAN_CONCURRENCY)
+
             async def scan_script(url):
-                nonlocal found
-                if found: return
-                try:
-                    resp = await self.client.get(url)
-                    if resp.status_code == 200:
-                        text = resp.text
-                        regex = r"appId\s*:\s*['\"]([^'\"]+)['\"]\s*,\s*key\s*:\s*['\"]([^'\"]+)['\"]"
-                        match = re.search(regex, text)
-                        if match:
-                            self.app_id = match.group(1)
-                            self.js_key = match.group(2)
-                            found = True
-                except Exception:
-                    pass
+                """Streams a script and returns (app_id, js_key) as soon as they appear, or None."""
+                result = {}
+
+                async def send():
+                    # Runs once per attempt of the scheduler, so every retry scans from the start
+                    async with self.client.stream('GET', url, extensions={'trace': self._trace}) as resp:
+                        if resp.status_code in RETRY_STATUSES:
+                            await resp.aread()
+                            raise RetryableStatusError(resp)
+                        if resp.status_code != 200:
+                            return resp
+                        # Keep the end of the previous chunk so matches across chunk boundaries are found
+                        tail = ""
+                        async for chunk in resp.aiter_text():
+                            buffer = tail + chunk
+                            match = KEYS_REGEX.search(buffer)
+                            if match:
+                                result["keys"] = match.group(1), match.group(2)
+                                break
+                            tail = buffer[-KEYS_SCAN_OVERLAP:]
+                        return resp
+
+                async with semaphore:
+                    try:
+                        await self.scheduler.request(send)
+                    except Exception:
+                        pass
+                    return result.get("keys")
+
+            # Stop downloading the remaining scripts as soon as one of them contains the keys
+            tasks = [asyncio.create_task(scan_script(url)) for url in target_scripts]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    keys = await next_done
+                    if keys:
+                        self.app_id, self.js_key = keys
+                        break
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
 
-            # httpx is async but we need to run these concurrently
-            # standard asyncio.gather works with coroutines
-            tasks = [scan_script(url) for url in target_scripts]
-            await asyncio.gather(*tasks)
             return bool(self.app_id and self.js_key)
 
         except Exception as e:
             raise Exception(f"Error extracting keys: {e}")
 
-    async def login(self):
+    @staticmethod
+    def _script_priority(url):
+        # The Parse config usually lives in the main/app bundle, vendor chunks come last
+        name = url.rsplit('/', 1)[-1].lower()
+        if 'main' in name or 'app' in name:
+            return 0
+        if 'vendor' in name or 'polyfill' in name:
+            return 2
+        return 1
+
+    @staticmethod
+    def _is_app_id_error(response):
+        # Parse rejects unknown application ids / JavaScript keys with 403 "unauthorized"
+        return response.status_code in [401, 403] and "unauthorized" in response.text.lower()
+
+    async def login(self, retry=True):
         if not self.email or not self.password:
              raise ValueError("Credentials not set.")
 
         if not await self.initialize():
-            raise Exception("Could not extract Parse keys from calimoto.com")
+            raise Exception(f"Could not extract Parse keys from {self.base_url}")
 
         if not self.installation_id:
             self.installation_id = str(uuid.uuid4())
 
-        url = "https://parse-server.prod.calimoto.com/parse/login"
+        url = f"{self.parse_url}/login"
         headers = {
             'Content-Type': 'text/plain',
-            'Origin': 'https://calimoto.com',
-            'Referer': 'https://calimoto.com/',
+            'Origin': self.base_url,
+            'Referer': f"{self.base_url}/",
         }
         payload = {
             "username": self.email,
@@ -123,30 +333,43 @@ class CalimotoClient:
         }
 
         try:
-            response = await self.client.post(url, json=payload, headers=headers)
+            response = await self._request('POST', url, json=payload, headers=headers)
             if response.status_code == 200:
-                data = response.json()
+                data = _decode_json(response.content)
                 self.user_id = data.get('objectId')
                 self.session_token = data.get('sessionToken')
+                if self.on_session_change:
+                    result = self.on_session_change(self.export_session())
+                    if inspect.isawaitable(result):
+                        await result
                 return True
+            elif retry and self.keys_from_cache and self._is_app_id_error(response):
+                # Cached keys are stale, scrape fresh ones and try once more
+                self.invalidate_cached_keys()
+                return await self.login(retry=False)
             else:
                 raise Exception(f"Login Error {response.status_code}: {response.text}")
         except Exception as e:
             raise e
 
-    async def _handle_auth_error(self):
-        self.session_token = None
-        return await self.login()
+    async def _handle_auth_error(self, stale_token=None):
+        # Concurrent requests may all see the expired session, only the first one logs in again
+        async with self._login_lock:
+            if stale_token and self.session_token and self.session_token != stale_token:
+                return True
+            self.session_token = None
+            return await self.login()
 
-    async def get_items(self, mode="routes", retry=True):
-        """Returns a list of items (routes or tracks)."""
-        class_name = "tblRoutes" if mode == "routes" else "tblTracks"
-        url = f"https://parse-server.prod.calimoto.com/parse/classes/{class_name}"
+    async def _query(self, class_name, params, retry=True):
+        """Runs a Parse query against class_name and returns the result rows."""
+        return (await self._query_data(class_name, params, retry)).get("results", [])
+
+    async def _query_data(self, class_name, params, retry=True):
+        """Runs a Parse query against class_name and returns the decoded response."""
+        url = f"{self.parse_url}/classes/{class_name}"
         headers = {'Content-Type': 'text/plain'}
         payload = {
-            "where": {"userId": self.user_id},
-            "include": "pictures",
-            "limit": 10000,
+            **params,
             "_method": "GET",
             "_ApplicationId": self.app_id,
             "_JavaScriptKey": self.js_key,
@@ -156,44 +379,191 @@ class CalimotoClient:
         }
 
         try:
-            response = await self.client.post(url, json=payload, headers=headers)
+            response = await self._request('POST', url, json=payload, headers=headers)
             if response.status_code == 200:
-                data = response.json()
-                return data.get("results", [])
+                return _decode_json(response.content)
             elif response.status_code in [400, 401, 403]:
                 text = response.text
                 if "209" in text or "invalid session" in text.lower():
-                    if retry and await self._handle_auth_error():
-                        return await self.get_items(mode, retry=False)
+                    if retry and await self._handle_auth_error(payload["_SessionToken"]):
+                        return await self._query_data(class_name, params, retry=False)
+                elif retry and self.keys_from_cache and self._is_app_id_error(response):
+                    # A restored session skipped login, so stale cached keys surface here
+                    self.invalidate_cached_keys()
+                    if await self.initialize():
+                        return await self._query_data(class_name, params, retry=False)
                 raise Exception(f"API Error {response.status_code}: {text}")
             else:
                 raise Exception(f"API Error {response.status_code}: {response.text}")
         except Exception as e:
             raise e
 
-    async def get_gpx_content(self, item, mode="routes"):
-        """Fetches data and returns the GPX string content."""
+    async def iter_pages(self, mode="routes", where=None, keys=None, include_pictures=False,
+                         page_size=PAGE_SIZE, prefetch=True, newest_first=False):
+        """
+        Yields the items (routes or tracks) page by page.
+
+        Pages are requested with an objectId cursor, so the result is complete no matter how
+        many items the account has. With prefetch the next page is already loading while the
+        caller processes the current one. `keys` limits the returned columns (objectId,
+        createdAt and updatedAt are always included), pictures are only joined on request.
+        With newest_first the items come ordered by descending createdAt, paged with a
+        (createdAt, objectId) cursor, so the first page already holds the latest items.
+        """
+        class_name = "tblRoutes" if mode == "routes" else "tblTracks"
+
+        async def fetch_page(after):
+            page_where = {**(where or {}), "userId": self.user_id}
+            if after and newest_first:
+                # Older items, or equally old ones not returned yet
+                created_at = {"__type": "Date", "iso": after['createdAt']}
+                page_where["$or"] = [{"createdAt": {"$lt": created_at}},
+                                     {"createdAt": created_at, "objectId": {"$gt": after['objectId']}}]
+            elif after:
+                page_where["objectId"] = {"$gt": after['objectId']}
+            params = {
+                "where": page_where,
+                "order": "-createdAt,objectId" if newest_first else "objectId",
+                "limit": page_size,
+            }
+            if keys:
+                params["keys"] = ",".join(keys)
+            if include_pictures:
+                params["include"] = "pictures"
+            return await self._query(class_name, params)
+
+        page = await fetch_page(None)
+        while page:
+            cursor = page[-1] if len(page) == page_size else None
+            next_page = asyncio.ensure_future(fetch_page(cursor)) if cursor and prefetch else None
+            try:
+                yield page
+            except BaseException:
+                # The caller stopped iterating early, don't leave the prefetch running
+                if next_page:
+                    next_page.cancel()
+                raise
+            if not cursor:
+                break
+            page = await next_page if next_page else await fetch_page(cursor)
+
+    async def iter_items(self, mode="routes", where=None, keys=None, include_pictures=False,
+                         page_size=PAGE_SIZE, prefetch=True):
+        """Yields the items (routes or tracks) one by one, loading pages as needed."""
+        async for page in self.iter_pages(mode, where, keys, include_pictures, page_size, prefetch):
+            for item in page:
+                yield item
+
+    async def get_items(self, mode="routes", where=None, keys=None, include_pictures=False):
+        """Returns a list of items (routes or tracks)."""
+        items = []
+        async for page in self.iter_pages(mode, where, keys, include_pictures):
+            items.extend(page)
+        return items
+
+    async def count_items(self, mode="routes", where=None):
+        """Returns the number of items (routes or tracks) without loading them."""
+        class_name = "tblRoutes" if mode == "routes" else "tblTracks"
+        params = {"where": {**(where or {}), "userId": self.user_id}, "count": 1, "limit": 0}
+        return (await self._query_data(class_name, params)).get("count", 0)
+
+    async def get_item(self, object_id, mode="routes", include_pictures=False):
+        """Returns the full row of a single item (route or track)."""
+        class_name = "tblRoutes" if mode == "routes" else "tblTracks"
+        params = {"where": {"objectId": object_id}, "limit": 1}
+        if include_pictures:
+            params["include"] = "pictures"
+        results = await self._query(class_name, params)
+        if not results:
+            raise ValueError(f"Item {object_id} not found.")
+        return results[0]
+
+    async def _get_blob(self, key, url, on_progress=None):
+        """
+        Downloads a Parse file and returns the array stored under key, see ArrayStreamParser.
+
+        The body is streamed into the parser chunk by chunk, calling on_progress(bytes_received,
+        content_length) as it arrives. Cached files are read from the blob cache instead, new
+        ones are compressed into it on the fly.
+        """
+        def parser():
+            return ArrayStreamParser(key, pairs=key == "points")
+
+        if self.blob_cache:
+            content = await asyncio.to_thread(self.blob_cache.get, url)
+            if content is not None:
+                blob = parser()
+                view = memoryview(content)
+                for start in range(0, len(view), BLOB_FEED_SIZE):
+                    blob.feed(view[start:start + BLOB_FEED_SIZE])
+                if on_progress:
+                    on_progress(len(content), len(content))
+                return blob.close()
+
+        result = {}
+
+        async def send():
+            # Runs once per attempt of the scheduler, so every retry starts from scratch
+            blob = parser()
+            compressor = self.blob_cache.compressor() if self.blob_cache else None
+            cached = []
+            async with self.client.stream('GET', url, extensions={'trace': self._trace}) as response:
+                if response.status_code in RETRY_STATUSES:
+                    await response.aread()
+                    raise RetryableStatusError(response)
+                if response.status_code != 200:
+                    return response
+                length = response.headers.get('Content-Length')
+                total = int(length) if length and length.isdigit() else None
+                async for chunk in response.aiter_bytes():
+                    blob.feed(chunk)
+                    if self.blob_cache:
+                        cached.append(compressor.compress(chunk) if compressor else chunk)
+                    if on_progress:
+                        # Counts the bytes on the wire, like Content-Length, even if compressed
+                        on_progress(response.num_bytes_downloaded, total)
+            result["values"] = blob.close()
+            if self.blob_cache:
+                result["cached"] = b"".join(cached) + (compressor.flush() if compressor else b"")
+            return response
+
+        response = await self.scheduler.request(send)
+        if response.status_code != 200:
+            raise Exception(f"Failed to download {key}: {response.status_code}")
+        if "cached" in result:
+            try:
+                await asyncio.to_thread(self.blob_cache.put, url, result["cached"], encoded=self.blob_cache.compress)
+            except OSError:
+                pass # Caching is best effort, the track itself downloaded fine
+        return result["values"]
+
+    async def get_track(self, item, mode="routes", on_progress=None):
+        """
+        Fetches the blobs of an item and returns them as a Track.
+
+        on_progress(bytes_received, total_bytes) reports the download of all blobs together,
+        total_bytes being None until the size of every blob is known.
+        """
+        if 'points' not in item and item.get('objectId'):
+            # Item comes from a projected listing, load the full row now that it is needed
+            item = {**item, **await self.get_item(item['objectId'], mode)}
+
         name = item.get('name', 'Unnamed')
         points_url = item.get('points', {}).get('url')
         
         if not points_url:
             raise ValueError("No points URL found.")
 
-        # Fetch points
-        response = await self.client.get(points_url)
-        points_data = response.json()
-        points = points_data.get("points", [])
-
-        altitudes = []
-        timestamps = []
-        speeds = []
         start_date = None
 
+        # Points are always needed, tracks additionally carry altitudes, dates and speeds
+        blob_urls = {"points": points_url}
+
         # For tracks, fetch extra data
         if mode == "tracks":
-            alt_url = item.get('altitudes', {}).get('url')
-            date_url = item.get('dates', {}).get('url')
-            speed_url = item.get('speeds', {}).get('url')
+            blob_urls["altitudes"] = item.get('altitudes', {}).get('url')
+            blob_urls["dates"] = item.get('dates', {}).get('url')
+            blob_urls["speeds"] = item.get('speeds', {}).get('url')
             
             # Parse base time
             created_at = item.get('timeCreated', {}).get('iso')
@@ -203,26 +573,33 @@ class CalimotoClient:
                 except Exception:
                     pass
 
-            if alt_url:
-                r = await self.client.get(alt_url)
-                alt_data = r.json()
-                altitudes = alt_data.get("altitudes", [])
-            
-            if date_url:
-                r = await self.client.get(date_url)
-                date_data = r.json()
-                timestamps = date_data.get("dates", [])
-                    
-            if speed_url:
-                r = await self.client.get(speed_url)
-                speed_data = r.json()
-                speeds = speed_data.get("speeds", [])
-
-        if points:
-            return self._convert_to_gpx(points, name, altitudes, timestamps, speeds, start_date)
-        else:
+        # Fetch all blobs concurrently, skipping the ones the item does not have
+        blob_urls = {key: url for key, url in blob_urls.items() if url}
+        progress = {key: (0, None) for key in blob_urls}
+
+        def blob_progress(key):
+            def report(received, total):
+                progress[key] = (received, total)
+                totals = [total for _, total in progress.values()]
+                on_progress(sum(received for received, _ in progress.values()),
+                            None if None in totals else sum(totals))
+            return report if on_progress else None
+
+        async def fetch_blob(key, url):
+            # The parser packs the values into compact arrays as they arrive
+            return key, await self._get_blob(key, url, blob_progress(key))
+
+        blobs = dict(await asyncio.gather(*(fetch_blob(key, url) for key, url in blob_urls.items())))
+        lat, lon = blobs["points"]
+        if not lat:
             raise ValueError("Invalid points data format received.")
 
+        return Track(name, lat, lon, blobs.get("altitudes", ()), blobs.get("dates", ()), blobs.get("speeds", ()), start_date)
+
+    async def get_gpx_content(self, item, mode="routes", tolerance=None):
+        """Fetches data and returns the GPX string content, simplified to `tolerance` metres if given."""
+        return export_bytes(await self.get_track(item, mode), "gpx", tolerance).decode('utf-8')
+
     @staticmethod
     def sanitize_filename(name):
         # Handle navigation arrows as requested (-> for →, <-> for ⇄)
@@ -242,48 +619,3 @@ class CalimotoClient:
         safe_name = re.sub(r'_+', '_', safe_name)
         
         return safe_name.strip('_')
-
-    @staticmethod
-    def _convert_to_gpx(points, name, altitudes=None, timestamps=None, speeds=None, start_date=None):
-        
-        gpx_header = f"""<?xml version="1.0" encoding="UTF-8"?>
-<gpx version="1.1" creator="Calimoto Route Exporter" 
-    xmlns="http://www.topografix.com/GPX/1/1"
-    xmlns:gpxtpx="http://www.garmin.com/xmlschemas/TrackPointExtension/v1"
-    xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
-    xsi:schemaLocation="http://www.topografix.com/GPX/1/1 http://www.topografix.com/GPX/1/1/gpx.xsd
-    http://www.garmin.com/xmlschemas/TrackPointExtension/v1 http://www.garmin.com/xmlschemas/TrackPointExtensionv1.xsd">
-  <trk>
-    <name>{name}</name>
-    <trkseg>"""
-        
-        gpx_points = ""
-        for i, (lat, lon) in enumerate(points):
-            ele = ""
-            time = ""
-            extensions = ""
-            
-            if altitudes and i < len(altitudes):
-                ele = f"<ele>{altitudes[i]}</ele>"
-            
-            if timestamps and i < len(timestamps) and start_date:
-                # Add milliseconds offset to start_date
-                ms_offset = timestamps[i]
-                point_time = start_date + timedelta(milliseconds=ms_offset)
-                time = f"<time>{point_time.isoformat()}</time>"
-
-            if speeds and i < len(speeds):
-                # Speed is already in m/s
-                extensions = f"""
-        <extensions>
-          <gpxtpx:TrackPointExtension>
-            <gpxtpx:speed>{speeds[i]}</gpxtpx:speed>
-          </gpxtpx:TrackPointExtension>
-        </extensions>"""
-
-            gpx_points += f'      <trkpt lat="{lat}" lon="{lon}">{ele}{time}{extensions}\n      </trkpt>\n'
-        
-        gpx_footer = """    </trkseg>
-  </trk>
-</gpx>"""
-        return gpx_header + "\n" + gpx_points + gpx_footer
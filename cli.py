@@ -1,24 +1,178 @@
+import argparse
 import asyncio
 import os
-from calimoto_client import CalimotoClient
+from contextlib import nullcontext
+from datetime import date
+from calimoto_client import CalimotoClient, EXPORT_KEYS, SUMMARY_KEYS
+from blob_cache import BlobCache
+from bulk_export import export_items, get_item_date, make_executor
+from exporters import EXPORTERS, export_file, get_exporter
+from archive import ArchiveWriter, archive_format_for, export_archive
+from sync import sync_items
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export routes and tracks from calimoto as GPX (or other) files.")
+    parser.add_argument("--all", action="store_true", help="Export all items without prompting")
+    parser.add_argument("--sync", action="store_true", help="Only export items changed since the last sync into --out-dir")
+    parser.add_argument("--mode", choices=["routes", "tracks"], help="Item type to export (default: both with --all/--sync, otherwise prompted)")
+    parser.add_argument("--since", type=date.fromisoformat, help="Only export items created on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--out-dir", default=".", help="Directory to save GPX files to (default: current directory)")
+    parser.add_argument("--archive", help="Write all GPX files into this .zip or .tar.gz instead of --out-dir (implies --all)")
+    parser.add_argument("--jobs", type=int, default=8, help="Number of concurrent downloads in --all/--sync mode (default: 8)")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="Processes converting GPX in --all/--sync mode, 0 to convert inline (default: up to 4)")
+    parser.add_argument("--format", choices=list(EXPORTERS), default="gpx",
+                        help="Output format (default: gpx). " +
+                             ", ".join(f"{e.name}: {e.description}" for e in EXPORTERS.values()))
+    parser.add_argument("--simplify", type=float, metavar="METRES",
+                        help="Simplify tracks so no dropped point is further than this from the result")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the local cache of downloaded track data")
+    parser.add_argument("--http2", action="store_true", help="Use HTTP/2 if the h2 package is installed")
+    args = parser.parse_args()
+    # The sync cursor would skip older items for good once a --since sync advanced it
+    if args.sync and args.since:
+        parser.error("--since cannot be combined with --sync")
+    if args.sync and args.archive:
+        parser.error("--archive cannot be combined with --sync")
+    return args
+
+
+def print_progress(done, total, item, path, error):
+    counter = f"[{done}/{total}]" if total is not None else f"[{done}]"
+    if error:
+        print(f"{counter} Failed {item.get('name', 'Unnamed')}: {error}")
+    else:
+        print(f"{counter} Saved {path}")
+
+
+def print_download_progress(received, total):
+    if total:
+        done = int(30 * min(received, total) / total)
+        print(f"\r[{'#' * done}{'.' * (30 - done)}] {received / 1e6:.1f}/{total / 1e6:.1f} MB", end="", flush=True)
+    else:
+        print(f"\r{received / 1e6:.1f} MB", end="", flush=True)
+
+
+def print_connection_stats(client):
+    stats = client.connection_stats()
+    print(f"{stats['requests']} requests over {stats['connections']} connections "
+          f"({stats['reused']} reused, {stats['http2_requests']} via HTTP/2).")
+
+
+def since_filter(args):
+    """Returns the where clause for --since, or None."""
+    if not args.since:
+        return None
+    return {"createdAt": {"$gte": {"__type": "Date", "iso": f"{args.since.isoformat()}T00:00:00.000Z"}}}
+
+
+async def export_all(client, mode, where, args):
+    print(f"Exporting {mode} to {args.out_dir} with {args.jobs} jobs...")
+
+    items = client.iter_items(mode, where, keys=EXPORT_KEYS)
+    with make_executor(args.workers) or nullcontext() as executor:
+        saved, failures = await export_items(client, items, mode, args.out_dir, args.jobs, print_progress,
+                                             executor=executor, tolerance=args.simplify,
+                                             export_format=args.format)
+    if not saved and not failures:
+        print(f"No {mode} found.")
+        return True
+    print(f"Exported {len(saved)} of {len(saved) + len(failures)} {mode}, {len(failures)} failed.")
+    return not failures
+
+
+async def archive_all(client, modes, where, args):
+    archive_format = archive_format_for(args.archive)
+    if not archive_format:
+        print("Archive must end in .zip, .tar.gz or .tgz")
+        return False
+
+    count = 0
+    success = True
+    with make_executor(args.workers) or nullcontext() as executor, ArchiveWriter(args.archive, archive_format) as archive:
+        for mode in modes:
+            print(f"Archiving {mode} into {args.archive}...")
+            # One folder per mode when both end up in the same archive
+            prefix = f"{mode}/" if len(modes) > 1 else ""
+            items = client.iter_items(mode, where, keys=EXPORT_KEYS)
+            saved, failures = await export_archive(client, archive, items, mode, prefix, args.jobs, print_progress, executor,
+                                                    args.simplify, args.format)
+            count += len(saved)
+            success = success and not failures
+    print(f"Archived {count} items into {args.archive}.")
+    print_connection_stats(client)
+    return success
+
+
+async def sync_all(client, modes, args):
+    def on_progress(done, total, item, path, error):
+        if error:
+            print(f"[{done}] Failed {item.get('name', 'Unnamed')}: {error}")
+        else:
+            print(f"[{done}] Updated {path}")
+
+    success = True
+    with make_executor(args.workers) or nullcontext() as executor:
+        for mode in modes:
+            print(f"Syncing {mode} to {args.out_dir}...")
+            saved, skipped, failures = await sync_items(client, mode, args.out_dir, args.jobs, on_progress, executor,
+                                                        args.simplify, args.format)
+            print(f"Updated {len(saved)} {mode}, {skipped} unchanged, {len(failures)} failed.")
+            success = success and not failures
+    print_connection_stats(client)
+    return success
+
 
 if __name__ == "__main__":
+    args = parse_args()
+
     async def main():
-        async with CalimotoClient() as client:
+        try:
+            get_exporter(args.format)
+        except ImportError as e:
+            print(e)
+            return False
+
+        blob_cache = None if args.no_cache else BlobCache()
+        async with CalimotoClient(http2=args.http2, blob_cache=blob_cache) as client:
+            if args.http2 and not client.http2:
+                print("HTTP/2 needs the h2 package (pip install httpx[http2]), using HTTP/1.1.")
             if not client.load_credentials_from_env_or_file():
                 print("No credentials found in environment or .credentials file.")
                 return
 
-            if not await client.login():
+            # Reuse the last session, it is only validated (and renewed) by the first request
+            client.load_session_from_file()
+            client.on_session_change = lambda session: client.save_session_to_file()
+            if not await client.ensure_session():
                 print("Login failed.")
                 return
 
-            print("\nSelect Mode:")
-            print("[1] Routes (Planned)")
-            print("[2] Tracks (Recorded via App)")
-            
-            mode = "routes"
-            while True:
+            if args.sync:
+                modes = [args.mode] if args.mode else ["routes", "tracks"]
+                return await sync_all(client, modes, args)
+
+            if args.archive:
+                modes = [args.mode] if args.mode else ["routes", "tracks"]
+                return await archive_all(client, modes, since_filter(args), args)
+
+            if args.all:
+                modes = [args.mode] if args.mode else ["routes", "tracks"]
+                success = True
+                for mode in modes:
+                    # Files end in _route/_track, so both modes can share the output directory
+                    success = await export_all(client, mode, since_filter(args), args) and success
+                print_connection_stats(client)
+                return success
+
+            mode = args.mode or "routes"
+            if not args.mode:
+                print("\nSelect Mode:")
+                print("[1] Routes (Planned)")
+                print("[2] Tracks (Recorded via App)")
+
+            while not args.mode:
                 choice = input("Enter choice (1 or 2): ").strip()
                 if choice == "1":
                     mode = "routes"
@@ -28,21 +182,18 @@ if __name__ == "__main__":
                     break
 
             print(f"Fetching {mode}...")
-            items = await client.get_items(mode)
+            items = await client.get_items(mode, keys=SUMMARY_KEYS)
             if not items:
                 print(f"No {mode} found.")
                 return
 
             print(f"\nFound {len(items)} {mode}:")
             
-            def get_date(r):
-                return r.get('createdAt') or r.get('timeCreated', {}).get('iso') or ""
-            
-            sorted_items = sorted(items, key=get_date, reverse=True)
+            sorted_items = sorted(items, key=get_item_date, reverse=True)
 
             for i, item in enumerate(sorted_items):
                 name = item.get('name', 'Unnamed')
-                date = get_date(item)[:10]
+                date = get_item_date(item)[:10]
                 dist_km = round(item.get('distance', 0) / 1000, 1)
                 print(f"[{i+1}] {name} ({dist_km} km) - {date}")
 
@@ -55,13 +206,12 @@ if __name__ == "__main__":
                         name = item.get('name', 'Unnamed')
                         
                         safe_name = CalimotoClient.sanitize_filename(name)
-                        filename = f"{safe_name}_{mode[:-1]}.gpx"
+                        filename = f"{safe_name}_{mode[:-1]}.{get_exporter(args.format).extension}"
                         
                         print(f"Downloading {filename}...")
-                        gpx_content = await client.get_gpx_content(item, mode)
-                        
-                        with open(filename, "w", encoding="utf-8") as f:
-                            f.write(gpx_content)
+                        track = await client.get_track(item, mode, print_download_progress)
+                        print()
+                        export_file(track, filename, args.format, args.simplify)
                             
                         print(f"Successfully saved to {filename}")
                         break
@@ -71,4 +221,5 @@ if __name__ == "__main__":
                     print(f"Error: {e}")
                     break
 
-    asyncio.run(main())
+    if asyncio.run(main()) is False:
+        raise SystemExit(1)
@@ -0,0 +1,164 @@
+import asyncio
+import time
+from collections import deque
+
+from bulk_export import convert
+from exporters import export_bytes
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+PROGRESS_INTERVAL = 0.1 # Seconds between progress notifications of a job
+
+
+class DownloadJob:
+    """
+    One item to download and encode, with its progress.
+
+    `received` counts the downloaded bytes of `total` (None until known), `points` is set once
+    the track data is loaded and `bytes` once it is encoded. Without a sink the encoded file
+    is kept in `data`, otherwise `sink(job, data)` receives it.
+    """
+    def __init__(self, item, mode, export_format="gpx", sink=None):
+        self.item = item
+        self.mode = mode
+        self.export_format = export_format
+        self.sink = sink
+        self.state = QUEUED
+        self.received = 0
+        self.total = None
+        self.points = 0
+        self.bytes = 0
+        self.data = None
+        self.error = None
+        self._task = None
+        self._finished = asyncio.Event()
+        self._notified = 0.0
+
+    @property
+    def name(self):
+        return self.item.get('name', 'Unnamed')
+
+    @property
+    def fraction(self):
+        """Returns the downloaded fraction between 0 and 1, or None while the size is unknown."""
+        return min(1.0, self.received / self.total) if self.total else None
+
+    @property
+    def finished(self):
+        return self.state in (DONE, FAILED, CANCELLED)
+
+    async def wait(self):
+        """Waits until the job is done, failed or cancelled."""
+        await self._finished.wait()
+
+    def __repr__(self):
+        return f"DownloadJob({self.name!r}, {self.state})"
+
+
+class DownloadManager:
+    """
+    Runs DownloadJobs in the background, at most `concurrency` at a time, in submission order.
+
+    Independent of any UI: `on_change(job)` is called whenever a job changes state or progress.
+    The conversion runs in `executor` if one is given (see bulk_export.make_executor).
+    """
+    def __init__(self, client, concurrency=3, on_change=None, tolerance=None, executor=None):
+        self.client = client
+        self.concurrency = max(1, concurrency)
+        self.on_change = on_change
+        self.tolerance = tolerance
+        self.executor = executor
+        self.jobs = []
+        self._queue = deque()
+        self._running = set()
+
+    def submit(self, item, mode, export_format="gpx", sink=None):
+        """Queues an item and returns its DownloadJob."""
+        job = DownloadJob(item, mode, export_format, sink)
+        self.jobs.append(job)
+        self._queue.append(job)
+        self._notify(job)
+        self._start_jobs()
+        return job
+
+    def set_concurrency(self, concurrency):
+        # Running jobs are never interrupted, a lower limit only applies to the next ones
+        self.concurrency = max(1, concurrency)
+        self._start_jobs()
+
+    def cancel(self, job):
+        if job.state == QUEUED:
+            self._queue.remove(job)
+            self._finish(job, CANCELLED)
+        elif job.state == RUNNING:
+            job._task.cancel()
+
+    def cancel_all(self):
+        for job in list(self._queue) + list(self._running):
+            self.cancel(job)
+
+    def clear_finished(self):
+        self.jobs = [job for job in self.jobs if not job.finished]
+
+    @property
+    def active(self):
+        return len(self._queue) + len(self._running)
+
+    def _notify(self, job):
+        if self.on_change:
+            self.on_change(job)
+
+    def _progress(self, job, received, total):
+        job.received = received
+        job.total = total
+        # Downloads report every chunk, throttle so a UI is not redrawn for each of them
+        now = time.monotonic()
+        if now - job._notified >= PROGRESS_INTERVAL or received == total:
+            job._notified = now
+            self._notify(job)
+
+    def _finish(self, job, state, error=None):
+        job.state = state
+        job.error = error
+        job._finished.set()
+        self._notify(job)
+
+    def _start_jobs(self):
+        while self._queue and len(self._running) < self.concurrency:
+            job = self._queue.popleft()
+            self._running.add(job)
+            job.state = RUNNING
+            job._task = asyncio.create_task(self._run(job))
+            job._task.add_done_callback(lambda task, job=job: self._task_done(job))
+            self._notify(job)
+
+    def _task_done(self, job):
+        # Also runs for tasks cancelled before they started, whose _run never got to finish the job
+        if not job.finished:
+            self._finish(job, CANCELLED)
+        self._running.discard(job)
+        self._start_jobs()
+
+    async def _run(self, job):
+        try:
+            def on_progress(received, total):
+                self._progress(job, received, total)
+
+            track = await self.client.get_track(job.item, job.mode, on_progress)
+            job.points = len(track)
+            self._notify(job)
+
+            data = await convert(self.executor, export_bytes, track, job.export_format, self.tolerance)
+            job.bytes = len(data)
+            if job.sink:
+                await job.sink(job, data)
+            else:
+                job.data = data
+            self._finish(job, DONE)
+        except asyncio.CancelledError:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            self._finish(job, FAILED, e)
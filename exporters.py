@@ -0,0 +1,371 @@
+import importlib.util
+import io
+import json
+import math
+import struct
+from array import array
+from datetime import timedelta
+from xml.sax.saxutils import escape
+
+from simplify import simplify_track
+
+try:
+    import numpy as np
+except ImportError:
+    np = None # Optional, required by the npz format and speeds up bulk timestamp formatting
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None # Optional, required by the parquet format
+
+FIT_EPOCH = 631065600 # 1989-12-31T00:00:00Z, the origin of FIT timestamps
+FIT_PROFILE_VERSION = 2100
+GPX_CHUNK_POINTS = 1000 # Track points per chunk when streaming GPX output
+
+
+class Exporter:
+    """An output format: `write(sink, track)` writes the encoded Track to a binary sink."""
+    def __init__(self, name, extension, write, description, requires=None):
+        self.name = name
+        self.extension = extension
+        self.write = write
+        self.description = description
+        self.requires = requires # Optional package the format depends on
+
+    @property
+    def available(self):
+        return self.requires is None or importlib.util.find_spec(self.requires) is not None
+
+
+EXPORTERS = {}
+
+
+def register_exporter(name, extension, description, requires=None):
+    """Decorator registering `write(sink, track)` as the exporter for a format."""
+    def decorator(write):
+        EXPORTERS[name] = Exporter(name, extension, write, description, requires)
+        return write
+    return decorator
+
+
+def available_formats():
+    return [name for name, exporter in EXPORTERS.items() if exporter.available]
+
+
+def get_exporter(name):
+    exporter = EXPORTERS.get(name)
+    if exporter is None:
+        raise ValueError(f"Unknown export format: {name}")
+    if not exporter.available:
+        raise ImportError(f"The {name} format requires the {exporter.requires} package")
+    return exporter
+
+
+def export_bytes(track, export_format="gpx", tolerance=None):
+    """Returns the Track encoded in the given format, simplified to `tolerance` metres if given."""
+    buffer = io.BytesIO()
+    get_exporter(export_format).write(buffer, simplify_track(track, tolerance))
+    return buffer.getvalue()
+
+
+def export_file(track, path, export_format="gpx", tolerance=None):
+    # Runs in the bulk export executor, so it must stay a picklable module-level function
+    exporter = get_exporter(export_format)
+    with open(path, "wb") as f:
+        exporter.write(f, simplify_track(track, tolerance))
+
+
+def _format_numbers(values):
+    """
+    Formats numbers like JSON.stringify wrote them into the blobs.
+
+    array('d') turns integral JSON numbers like 523 into 523.0, drop the fraction again so the
+    output does not depend on how the values were stored.
+    """
+    if isinstance(values, array) and values.typecode == 'd':
+        return [text[:-2] if text.endswith('.0') else text for text in map(repr, values)]
+    return [f"{value}" for value in values]
+
+
+def _format_column(values, start, end, prefix, suffix):
+    """Returns the tags for values[start:end], padded with empty strings where values run out."""
+    tags = [f"{prefix}{value}{suffix}" for value in _format_numbers(values[start:end])] if values else []
+    return tags + [""] * (end - start - len(tags))
+
+
+def _format_times(timestamps, start, end, start_date):
+    """
+    Returns the <time> tags for the millisecond offsets timestamps[start:end] relative to start_date.
+
+    Integer offsets are converted in bulk (with NumPy when available), producing the same text
+    as start_date + timedelta(milliseconds=offset) formatted with isoformat().
+    """
+    offsets = timestamps[start:end] if timestamps and start_date else []
+    if not offsets:
+        return [""] * (end - start)
+    if not all(type(offset) is int for offset in offsets):
+        # Fractional offsets need timedelta's exact rounding
+        tags = [f"<time>{(start_date + timedelta(milliseconds=offset)).isoformat()}</time>" for offset in offsets]
+        return tags + [""] * (end - start - len(tags))
+
+    # Split into whole seconds since the start second and the remaining microseconds
+    base = start_date.replace(tzinfo=None, microsecond=0)
+    suffix = start_date.replace(microsecond=0).isoformat()[len(base.isoformat()):] # UTC offset, if any
+    if np is not None:
+        micros = np.asarray(offsets, dtype=np.int64) * 1000 + start_date.microsecond
+        seconds, micros = np.divmod(micros, 1_000_000)
+        prefixes = np.datetime_as_string(np.datetime64(base, 's') + seconds.astype('timedelta64[s]'), unit='s').tolist()
+        micros = micros.tolist()
+    else:
+        prefixes = []
+        micros = []
+        cache = {}
+        for offset in offsets:
+            second, micro = divmod(offset * 1000 + start_date.microsecond, 1_000_000)
+            prefix = cache.get(second)
+            if prefix is None:
+                prefix = cache[second] = (base + timedelta(seconds=second)).isoformat()
+            prefixes.append(prefix)
+            micros.append(micro)
+
+    tags = [
+        f"<time>{prefix}.{micro:06d}{suffix}</time>" if micro else f"<time>{prefix}{suffix}</time>"
+        for prefix, micro in zip(prefixes, micros)
+    ]
+    return tags + [""] * (end - start - len(tags))
+
+
+def _iso_times(track):
+    """Returns the ISO 8601 time of each point (as written to GPX), or an empty list."""
+    if not track.time or not track.start_date:
+        return []
+    count = min(len(track.time), len(track))
+    return [tag[6:-7] for tag in _format_times(track.time, 0, count, track.start_date)]
+
+
+def _epoch_seconds(track):
+    """Returns the UNIX time of each point in seconds, or an empty list."""
+    if not track.time or not track.start_date:
+        return []
+    start = track.start_date.timestamp()
+    return [start + offset / 1000 for offset in track.time[:len(track)]]
+
+
+def iter_gpx(track):
+    """Yields the GPX document of a Track in chunks of GPX_CHUNK_POINTS track points."""
+    yield f"""<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="Calimoto Route Exporter" 
+    xmlns="http://www.topografix.com/GPX/1/1"
+    xmlns:gpxtpx="http://www.garmin.com/xmlschemas/TrackPointExtension/v1"
+    xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+    xsi:schemaLocation="http://www.topografix.com/GPX/1/1 http://www.topografix.com/GPX/1/1/gpx.xsd
+    http://www.garmin.com/xmlschemas/TrackPointExtension/v1 http://www.garmin.com/xmlschemas/TrackPointExtensionv1.xsd">
+  <trk>
+    <name>{escape(track.name)}</name>
+    <trkseg>
+"""
+
+    # Format each column of a chunk in bulk, then assemble the track points
+    for start in range(0, len(track), GPX_CHUNK_POINTS):
+        end = min(start + GPX_CHUNK_POINTS, len(track))
+        lats = _format_numbers(track.lat[start:end])
+        lons = _format_numbers(track.lon[start:end])
+        eles = _format_column(track.ele, start, end, "<ele>", "</ele>")
+        times = _format_times(track.time, start, end, track.start_date)
+        # Speed is already in m/s
+        extensions = _format_column(track.speed, start, end, """
+        <extensions>
+          <gpxtpx:TrackPointExtension>
+            <gpxtpx:speed>""", """</gpxtpx:speed>
+          </gpxtpx:TrackPointExtension>
+        </extensions>""")
+        yield "".join([
+            f'      <trkpt lat="{lat}" lon="{lon}">{ele}{time}{extension}\n      </trkpt>\n'
+            for lat, lon, ele, time, extension in zip(lats, lons, eles, times, extensions)
+        ])
+
+    yield """    </trkseg>
+  </trk>
+</gpx>"""
+
+
+@register_exporter("gpx", "gpx", "GPX 1.1 track")
+def write_gpx(sink, track):
+    # Encodes chunk by chunk, the document is never held as one string
+    for chunk in iter_gpx(track):
+        sink.write(chunk.encode('utf-8'))
+
+
+@register_exporter("geojson", "geojson", "GeoJSON LineString feature")
+def write_geojson(sink, track):
+    # Altitudes go into the coordinates, times and speeds into the coordinateProperties used by togeojson
+    coordinates = [[lon, lat] for lat, lon in zip(track.lat, track.lon)]
+    for coordinate, ele in zip(coordinates, track.ele):
+        coordinate.append(ele)
+    properties = {"name": track.name}
+    coordinate_properties = {}
+    times = _iso_times(track)
+    if times:
+        coordinate_properties["times"] = times
+    if track.speed:
+        coordinate_properties["speeds"] = track.speed.tolist() if isinstance(track.speed, array) else track.speed
+    if coordinate_properties:
+        properties["coordinateProperties"] = coordinate_properties
+    feature = {
+        "type": "Feature",
+        "properties": properties,
+        "geometry": {"type": "LineString", "coordinates": coordinates},
+    }
+    sink.write(json.dumps(feature, separators=(",", ":"), ensure_ascii=False).encode('utf-8'))
+
+
+@register_exporter("kml", "kml", "KML placemark (gx:Track when timestamps exist)")
+def write_kml(sink, track):
+    sink.write(f"""<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2" xmlns:gx="http://www.google.com/kml/ext/2.2">
+  <Placemark>
+    <name>{escape(track.name)}</name>
+""".encode('utf-8'))
+
+    lats = _format_numbers(track.lat)
+    lons = _format_numbers(track.lon)
+    eles = _format_numbers(track.ele)
+    times = _iso_times(track)
+    if times:
+        # gx:Track needs a time for every coordinate, points after the last time are dropped
+        sink.write(b"    <gx:Track>\n      <altitudeMode>absolute</altitudeMode>\n")
+        sink.write("".join(f"      <when>{time}</when>\n" for time in times).encode('utf-8'))
+        sink.write("".join(
+            f"      <gx:coord>{lon} {lat}{' ' + ele if ele else ''}</gx:coord>\n"
+            for lat, lon, ele, _ in zip(lats, lons, eles + [""] * (len(lats) - len(eles)), times)
+        ).encode('utf-8'))
+        sink.write(b"    </gx:Track>\n")
+    else:
+        sink.write(b"    <LineString>\n      <coordinates>\n")
+        sink.write("".join(
+            f"        {lon},{lat}{',' + ele if ele else ''}\n"
+            for lat, lon, ele in zip(lats, lons, eles + [""] * (len(lats) - len(eles)))
+        ).encode('utf-8'))
+        sink.write(b"      </coordinates>\n    </LineString>\n")
+    sink.write(b"  </Placemark>\n</kml>")
+
+
+def _columns(track):
+    """Returns the columns as float64 NumPy arrays of the track length, NaN where a column runs out."""
+    columns = {}
+    for name, values in track.to_numpy().items():
+        column = np.full(len(track), np.nan)
+        column[:len(values)] = values
+        columns[name] = column
+    return columns
+
+
+def _times_ms(track, columns):
+    """Returns the absolute point times as datetime64[ms] (NaT where missing), or None without a start date."""
+    if not track.start_date:
+        return None
+    start = np.datetime64(round(track.start_date.timestamp() * 1000), 'ms')
+    offsets = columns["time"]
+    times = np.full(len(track), np.datetime64('NaT'), dtype='datetime64[ms]')
+    valid = ~np.isnan(offsets)
+    times[valid] = start + np.round(offsets[valid]).astype(np.int64).astype('timedelta64[ms]')
+    return times
+
+
+@register_exporter("npz", "npz", "NumPy columns (lat, lon, ele, time, speed)", requires="numpy")
+def write_npz(sink, track):
+    columns = _columns(track)
+    times = _times_ms(track, columns)
+    if times is not None:
+        columns["time"] = times
+    np.savez_compressed(sink, name=np.array(track.name), **columns)
+
+
+@register_exporter("parquet", "parquet", "Parquet table (lat, lon, ele, time, speed)", requires="pyarrow")
+def write_parquet(sink, track):
+    columns = _columns(track)
+    times = _times_ms(track, columns)
+    table = pa.table({
+        "lat": pa.array(columns["lat"]),
+        "lon": pa.array(columns["lon"]),
+        "ele": pa.array(columns["ele"], from_pandas=True), # NaN becomes null
+        "time": pa.array(times, type=pa.timestamp('ms', tz='UTC')) if times is not None
+                else pa.array(columns["time"], from_pandas=True),
+        "speed": pa.array(columns["speed"], from_pandas=True),
+    }).replace_schema_metadata({"name": track.name})
+    pq.write_table(table, sink, compression="zstd")
+
+
+def _fit_crc(data, crc=0):
+    table = _FIT_CRC_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def _make_crc_table():
+    # CRC-16 with the reflected polynomial 0xA001, as specified by the FIT SDK
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+_FIT_CRC_TABLE = _make_crc_table()
+
+
+@register_exporter("fit", "fit", "Garmin FIT activity (or course without timestamps)")
+def write_fit(sink, track):
+    """
+    Writes a FIT file with a file_id message followed by one record message per point.
+
+    Only records are written, no laps or sessions. Times are whole seconds, altitudes have a
+    resolution of 0.2 m and speeds of 1 mm/s.
+    """
+    times = _epoch_seconds(track)
+    data = bytearray()
+
+    # file_id (global message 0): type, manufacturer (255 = development), product, time_created
+    data += struct.pack("<BBBHB", 0x40, 0, 0, 0, 4) + bytes([0, 1, 0x00, 1, 2, 0x84, 2, 2, 0x84, 4, 4, 0x86])
+    time_created = int(times[0]) - FIT_EPOCH if times else 0xFFFFFFFF
+    data += struct.pack("<BBHHI", 0x00, 4 if times else 6, 255, 0, time_created)
+
+    # record (global message 20), only with the fields the track has
+    fields = [(0, 4, 0x85, "i"), (1, 4, 0x85, "i")] # position_lat, position_long in semicircles
+    if times:
+        fields.insert(0, (253, 4, 0x86, "I"))
+    if track.ele:
+        fields.append((2, 2, 0x84, "H")) # altitude, scale 5, offset 500
+    if track.speed:
+        fields.append((6, 2, 0x84, "H")) # speed, scale 1000
+    data += struct.pack("<BBBHB", 0x41, 0, 0, 20, len(fields))
+    for number, size, base_type, _ in fields:
+        data += bytes([number, size, base_type])
+    record = struct.Struct("<B" + "".join(code for *_, code in fields))
+
+    semicircles = 2 ** 31 / 180
+    ele_count, speed_count, time_count = len(track.ele), len(track.speed), len(times)
+    for i, (lat, lon) in enumerate(zip(track.lat, track.lon)):
+        values = [0x01]
+        if times:
+            values.append(int(times[i]) - FIT_EPOCH if i < time_count else 0xFFFFFFFF)
+        values.append(round(lat * semicircles))
+        values.append(round(lon * semicircles))
+        if ele_count:
+            ele = track.ele[i] if i < ele_count else None
+            values.append(min(max(round((ele + 500) * 5), 0), 0xFFFE) if ele is not None and not math.isnan(ele) else 0xFFFF)
+        if speed_count:
+            speed = track.speed[i] if i < speed_count else None
+            values.append(min(max(round(speed * 1000), 0), 0xFFFE) if speed is not None and not math.isnan(speed) else 0xFFFF)
+        data += record.pack(*values)
+
+    header = struct.pack("<BBHI4s", 14, 0x10, FIT_PROFILE_VERSION, len(data), b".FIT")
+    header += struct.pack("<H", _fit_crc(header))
+    sink.write(header)
+    sink.write(data)
+    sink.write(struct.pack("<H", _fit_crc(data, _fit_crc(header))))
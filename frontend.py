@@ -2,11 +2,27 @@ import flet as ft
 import asyncio
 import base64
 import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import flet_secure_storage
 
 from calimoto_client import CalimotoClient
+from blob_cache import BlobCache
+from listing_cache import ListingCache
+from archive import ArchiveWriter, item_datetime
+from bulk_export import get_item_date, unique_filename
+from download_manager import DownloadManager, DONE, FAILED, QUEUED, RUNNING
+from exporters import EXPORTERS, available_formats
+
+TILE_BATCH = 50 # List tiles built per scroll step
+TILE_HEIGHT = 64 # Fixed, so the position of every item in the list is known without building it
+TILE_SPACING = 10
+REVALIDATE_INTERVAL = 60 # Seconds a cached listing is shown without checking for changes
+DOWNLOAD_CONCURRENCY = 3 # Default number of parallel downloads
+ENCODE_WORKERS = 2 # Threads encoding downloaded tracks, processes are not available on Android
 
 async def main(page: ft.Page):
     page.title = "Calimoto Exporter"
@@ -21,8 +37,13 @@ async def main(page: ft.Page):
     else:
         secure_storage = flet_secure_storage.SecureStorage()
     
-    # Client instance
-    client = CalimotoClient()
+    # Client instance, re-downloads of the same item are served from the local blob cache
+    try:
+        blob_cache = BlobCache()
+    except OSError as ex:
+        print(f"Blob cache unavailable: {ex}")
+        blob_cache = None
+    client = CalimotoClient(blob_cache=blob_cache)
     
     class StatusText(ft.Text):
         def show_status(self, message):
@@ -55,6 +76,8 @@ async def main(page: ft.Page):
                 await secure_storage.remove("calimoto_email")
             if await secure_storage.contains_key("calimoto_password"):
                 await secure_storage.remove("calimoto_password")
+            if await secure_storage.contains_key("calimoto_session"):
+                await secure_storage.remove("calimoto_session")
         except Exception as ex:
             print(f"Error removing secure credentials: {ex}")
             
@@ -71,7 +94,16 @@ async def main(page: ft.Page):
         client.user_id = None
         
         # Clear UI (will be defined later)
-        items_list.controls.clear()
+        views.clear()
+        listing_cache.invalidate()
+        for ids in selected.values():
+            ids.clear()
+        downloads.cancel_all()
+        downloads.jobs.clear()
+        download_rows.clear()
+        downloads_list.controls.clear()
+        downloads_panel.visible = False
+        items_list.controls = []
         email_input.value = ""
         password_input.value = ""
         login_error.clear()
@@ -79,6 +111,15 @@ async def main(page: ft.Page):
         # Show login screen (will be called later)
         show_login()
 
+    # Persist every new session so the next start can skip the login
+    async def save_session(session):
+        try:
+            await secure_storage.set("calimoto_session", json.dumps(session))
+        except Exception as ex:
+            print(f"Failed to save session: {ex}")
+
+    client.on_session_change = save_session
+
     # Check for stored session
     async def check_session():
         try:
@@ -94,6 +135,16 @@ async def main(page: ft.Page):
             if stored_email and stored_password:
                 client.email = stored_email
                 client.password = stored_password
+
+                # Reuse the stored session instead of logging in, the first listing validates it
+                try:
+                    stored_session = await secure_storage.get("calimoto_session")
+                    if stored_session and client.restore_session(json.loads(stored_session)):
+                        if await client.ensure_session():
+                            await show_dashboard()
+                            return True
+                except Exception as ex:
+                    print(f"Session restoration failed: {ex}")
                 
                 try:
                     login_error.show_status("Logging in with stored credentials...")
@@ -120,8 +171,10 @@ async def main(page: ft.Page):
                     client.user_id = session_data.get("user_id")
                     client.installation_id = session_data.get("installation_id")
                     try:
+                        # Without credentials an expired session cannot be renewed, so check it
+                        # with a cheap count query before showing the dashboard (a 209 logs out)
                         await client.initialize()
-                        await client.get_items("routes") 
+                        await client.count_items("routes")
                         await show_dashboard()
                         return True
                     except Exception as ex:
@@ -187,96 +240,407 @@ async def main(page: ft.Page):
 
     # --- Dashboard View ---
     
-    items_list = ft.ListView(expand=True, spacing=10)
+    items_list = ft.ListView(expand=True, spacing=TILE_SPACING, scroll_interval=100)
     status_text = StatusText()
+    # Items currently shown, used by "Download all"
+    loaded = {"mode": "routes", "items": []}
+    format_dropdown = ft.Dropdown(
+        value="gpx",
+        width=130,
+        dense=True,
+        tooltip="Export format",
+        options=[ft.dropdown.Option(key=name, text=name.upper()) for name in available_formats()],
+    )
     
-    async def load_items(mode):
+    # Tiles are built in batches as the list scrolls, and kept per mode so switching tabs reuses them.
+    # Only the tiles around the visible part of the list exist, spacers stand in for the others.
+    views = {}
+    # Listings per mode, revalidated with delta queries instead of being reloaded
+    listing_cache = ListingCache(client)
+    revalidating = set()
+    # objectIds ticked for "download selected", per mode
+    selected = {"routes": set(), "tracks": set()}
+
+    def build_tile(item, mode):
+        name = item.get('name', 'Unnamed')
+        date_str = get_item_date(item)[:10]
+        dist_km = round(item.get('distance', 0) / 1000, 1)
+
+        async def handler(e):
+            await download_item(item, mode)
+
+        def toggle(e):
+            if e.control.value:
+                selected[mode].add(item['objectId'])
+            else:
+                selected[mode].discard(item['objectId'])
+            status_text.show_status(f"{len(selected[mode])} {mode} selected")
+
+        return ft.Container(
+            content=ft.Row(
+                [
+                    ft.Checkbox(value=item['objectId'] in selected[mode], on_change=toggle),
+                    ft.Column([
+                        ft.Text(name, weight=ft.FontWeight.BOLD, no_wrap=True, overflow=ft.TextOverflow.ELLIPSIS),
+                        ft.Text(f"{date_str} • {dist_km} km", size=12, color=ft.Colors.GREY_400)
+                    ], expand=True),
+                    ft.IconButton(
+                        icon=ft.Icons.DOWNLOAD,
+                        tooltip="Download",
+                        data=item,
+                        on_click=handler
+                    )
+                ],
+                alignment=ft.MainAxisAlignment.SPACE_BETWEEN
+            ),
+            height=TILE_HEIGHT,
+            padding=10,
+            border=ft.Border.all(1, ft.Colors.GREY_800),
+            border_radius=5,
+            data=item,
+        )
+
+    def spacer(rows):
+        # Takes the place of `rows` tiles including the spacing between them
+        return ft.Container(height=max(0, rows * (TILE_HEIGHT + TILE_SPACING) - TILE_SPACING), visible=rows > 0)
+
+    def set_items(mode, items):
+        """Stores the items of a mode sorted by date, keeping the built tiles of unchanged items."""
+        items.sort(key=get_item_date, reverse=True)
+        old = views.get(mode)
+        tiles = {tile.data['objectId']: tile for tile in old["tiles"]} if old else {}
+        views[mode] = {
+            "items": items,
+            "tiles": [], # Built tiles of the items within the window
+            "shown": min(len(items), max(old["shown"], TILE_BATCH) if old else TILE_BATCH), # Rows the list spans
+            "first": old["first"] if old else 0, # Visible rows at the last scroll event
+            "last": old["last"] if old else 0,
+        }
+        place_tiles(mode, tiles)
+
+    def place_tiles(mode, reuse=None):
+        """
+        Builds the tiles within a batch of the visible rows and drops the others, returns True if that changed any.
+
+        The window moves in whole batches, so scrolling within a batch changes nothing. Tiles
+        in `reuse` (by objectId) are kept if their item is unchanged, by default the built ones.
+        """
+        view = views[mode]
+        start = min(max(0, (view["first"] // TILE_BATCH - 1) * TILE_BATCH), view["shown"])
+        end = min(view["shown"], (view["last"] // TILE_BATCH + 2) * TILE_BATCH)
+        if reuse is None:
+            if view.get("window") == (start, end, view["shown"]):
+                return False
+            reuse = {tile.data['objectId']: tile for tile in view["tiles"]}
+        tiles = []
+        for item in view["items"][start:end]:
+            tile = reuse.get(item['objectId'])
+            tiles.append(tile if tile is not None and tile.data is item else build_tile(item, mode))
+        view["tiles"] = tiles
+        view["window"] = (start, end, view["shown"])
+        view["controls"] = [spacer(start), *tiles, spacer(view["shown"] - end)]
+        return True
+
+    def show_view(mode):
+        view = views[mode]
+        loaded["mode"] = mode
+        loaded["items"] = view["items"]
+        items_list.controls = view["controls"]
+        status_text.show_status(f"Found {len(view['items'])} {mode}")
+
+    async def on_list_scroll(e):
+        view = views.get(loaded["mode"])
+        if not view:
+            return
+        stride = TILE_HEIGHT + TILE_SPACING
+        view["first"] = int(e.pixels // stride)
+        view["last"] = int((e.pixels + e.viewport_dimension) // stride)
+        # Extend the list by a batch once the user is within a screen of its end
+        if e.pixels >= e.max_scroll_extent - e.viewport_dimension and view["shown"] < len(view["items"]):
+            view["shown"] = min(len(view["items"]), view["shown"] + TILE_BATCH)
+        if not place_tiles(loaded["mode"]):
+            return
+        items_list.controls = view["controls"]
+        items_list.update()
+
+    items_list.on_scroll = on_list_scroll
+
+    async def show_load_error(ex):
+        if "invalid session" in str(ex).lower() or "209" in str(ex):
+             status_text.show_error("Session expired", ex)
+             await asyncio.sleep(2)
+             await logout(None) # Pass None as event
+        else:
+            status_text.show_error("Error", ex)
+
+    async def revalidate(mode):
+        if mode in revalidating:
+            return
+        revalidating.add(mode)
+        try:
+            items, changed = await listing_cache.refresh(mode)
+            if changed:
+                set_items(mode, items)
+                if loaded["mode"] == mode:
+                    show_view(mode)
+                    items_list.update()
+        except Exception as ex:
+            await show_load_error(ex)
+        finally:
+            revalidating.discard(mode)
+
+    async def load_items(mode, refresh=False):
+        if mode in views:
+            # Show the cached listing right away and bring it up to date in the background
+            show_view(mode)
+            page.update()
+            age = listing_cache.age(mode)
+            if refresh or age is None or age > REVALIDATE_INTERVAL:
+                page.run_task(revalidate, mode)
+            return
+
         status_text.show_status(f"Loading {mode}...")
-        items_list.controls.clear()
+        loaded["mode"] = mode
+        loaded["items"] = []
+        items_list.controls = []
         page.update()
-        
+
+        def on_page(items):
+            # Pages arrive newest first, show them while the older ones are still loading
+            set_items(mode, list(items))
+            if loaded["mode"] == mode:
+                show_view(mode)
+                status_text.show_status(f"Loading {mode}... {len(items)} so far")
+                page.update()
+
+        # Keeps revalidate() from starting a second full load while this one runs
+        revalidating.add(mode)
         try:
-            items = await client.get_items(mode)
-            
-            # Sort by date
-            def get_date(r):
-                return r.get('createdAt') or r.get('timeCreated', {}).get('iso') or ""
-            items.sort(key=get_date, reverse=True)
-            
-            for item in items:
-                name = item.get('name', 'Unnamed')
-                date_str = get_date(item)[:10]
-                dist_km = round(item.get('distance', 0) / 1000, 1)
-
-                def create_download_handler(item, mode):
-                    async def handler(e):
-                        await download_item(item, mode)
-                    return handler
-                
-                # Create list tile
-                tile = ft.Container(
-                    content=ft.Row(
-                        [
-                            ft.Column([
-                                ft.Text(name, weight=ft.FontWeight.BOLD),
-                                ft.Text(f"{date_str} • {dist_km} km", size=12, color=ft.Colors.GREY_400)
-                            ], expand=True),
-                            ft.IconButton(
-                                icon=ft.Icons.DOWNLOAD,
-                                tooltip="Download GPX",
-                                data=item,
-                                on_click=create_download_handler(item, mode)
-                            )
-                        ],
-                        alignment=ft.MainAxisAlignment.SPACE_BETWEEN
-                    ),
-                    padding=10,
-                    border=ft.Border.all(1, ft.Colors.GREY_800),
-                    border_radius=5,
-                )
-                items_list.controls.append(tile)
-            
-            status_text.show_status(f"Found {len(items)} {mode}")
-            
+            items, _ = await listing_cache.refresh(mode, on_page=on_page)
+            set_items(mode, items)
+            if loaded["mode"] == mode:
+                show_view(mode)
         except Exception as ex:
-            if "invalid session" in str(ex).lower() or "209" in str(ex):
-                 status_text.show_error("Session expired", ex)
-                 await asyncio.sleep(2)
-                 await logout(None) # Pass None as event
-            else:
-                status_text.show_error("Error", ex)
+            await show_load_error(ex)
+        finally:
+            revalidating.discard(mode)
         
         page.update()
 
+    # --- Downloads ---
+
+    download_rows = {}
+    downloads_list = ft.Column(spacing=5, scroll=ft.ScrollMode.AUTO, height=150)
+
+    def job_filename(job):
+        return f"{client.sanitize_filename(job.name)}_{job.mode[:-1]}.{EXPORTERS[job.export_format].extension}"
+
+    def build_job_row(job):
+        async def save(e):
+            await save_job(job)
+
+        row = ft.Row(
+            [
+                ft.Text(job.name, expand=True, no_wrap=True),
+                ft.Text(size=12, color=ft.Colors.GREY_400),
+                ft.ProgressBar(width=80),
+                ft.IconButton(icon=ft.Icons.SAVE, tooltip="Save", on_click=save, visible=False),
+                ft.IconButton(icon=ft.Icons.CLOSE, tooltip="Cancel", on_click=lambda e: downloads.cancel(job)),
+            ]
+        )
+        downloads_list.controls.append(row)
+        return row
+
+    def on_job_change(job):
+        if job not in downloads.jobs:
+            return # Discarded on logout
+        row = download_rows.get(job)
+        if row is None:
+            row = download_rows[job] = build_job_row(job)
+            downloads_panel.visible = True
+            if downloads_panel.page:
+                downloads_panel.update()
+
+        _, progress_text, progress_bar, save_button, cancel_button = row.controls
+        details = [job.state]
+        if job.state == RUNNING and job.received:
+            size = f" of {job.total / 1024:,.0f}" if job.total else ""
+            details.append(f"{job.received / 1024:,.0f}{size} KB")
+        if job.points:
+            details.append(f"{job.points:,} points")
+        if job.bytes:
+            details.append(f"{job.bytes / 1024:,.0f} KB {job.export_format.upper()}")
+        if job.error:
+            details.append(str(job.error))
+        progress_text.value = " • ".join(details)
+        progress_text.color = ft.Colors.RED if job.state == FAILED else ft.Colors.GREY_400
+        if job.state == QUEUED:
+            progress_bar.value = 0
+        else:
+            # Indeterminate until the download size is known and again while converting
+            progress_bar.value = None if job.points else job.fraction
+        progress_bar.visible = job.state in (QUEUED, RUNNING)
+        save_button.visible = job.state == DONE and job.data is not None
+        cancel_button.visible = not job.finished
+        if row.page:
+            row.update()
+
+    # Encoding (and simplifying) a long track takes a while, keep it off the event loop so the UI stays responsive
+    downloads = DownloadManager(client, DOWNLOAD_CONCURRENCY, on_change=on_job_change,
+                                executor=ThreadPoolExecutor(ENCODE_WORKERS))
+
+    def on_concurrency_change(e):
+        downloads.set_concurrency(int(e.control.value))
+
+    def clear_finished(e):
+        for job in [job for job in downloads.jobs if job.finished]:
+            downloads_list.controls.remove(download_rows.pop(job))
+        downloads.clear_finished()
+        downloads_panel.visible = bool(downloads.jobs)
+        page.update()
+
+    downloads_panel = ft.Column(
+        [
+            ft.Row(
+                [
+                    ft.Text("Downloads", weight=ft.FontWeight.BOLD),
+                    ft.Row(
+                        [
+                            ft.Dropdown(
+                                value=str(DOWNLOAD_CONCURRENCY),
+                                width=110,
+                                dense=True,
+                                label="Parallel",
+                                options=[ft.dropdown.Option(str(n)) for n in (1, 2, 3, 4, 6, 8)],
+                                on_select=on_concurrency_change,
+                            ),
+                            ft.IconButton(icon=ft.Icons.CANCEL, tooltip="Cancel all", on_click=lambda e: downloads.cancel_all()),
+                            ft.IconButton(icon=ft.Icons.CLEAR_ALL, tooltip="Clear finished", on_click=clear_finished),
+                        ],
+                        spacing=10,
+                    ),
+                ],
+                alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+            ),
+            downloads_list,
+        ],
+        visible=False,
+    )
+
     async def download_item(item, mode):
+        # Runs in the background, the finished job offers a save button
+        downloads.submit(item, mode, format_dropdown.value)
+        status_text.show_status(f"Queued {item.get('name', 'Unnamed')} ({downloads.active} active downloads)")
+
+    async def save_job(job):
+        filename = job_filename(job)
         try:
-            name = item.get('name', 'Unnamed')
-            safe_name = client.sanitize_filename(name)
-            filename = f"{safe_name}_{mode[:-1]}.gpx"
-            
-            status_text.show_status(f"Downloading {filename}...")
-            page.update()
-            
-            gpx_content = await client.get_gpx_content(item, mode)
-            
-            status_text.show_status(f"Select location to save {filename}...")
-            page.update()
-            
             # On Linux, this control requires Zenity when running Flet as a desktop app. It is not required when running Flet in a browser.
             path = await ft.FilePicker().save_file(
-                file_name=filename, 
-                allowed_extensions=["gpx"],
-                src_bytes=gpx_content.encode('utf-8')
+                file_name=filename,
+                allowed_extensions=[EXPORTERS[job.export_format].extension],
+                src_bytes=job.data
             )
-            
             if path:
+                job.data = None # Saved, no need to keep it in memory
+                on_job_change(job)
                 status_text.show_status(f"Saved to {path}")
             else:
                 status_text.show_status("Save cancelled")
-            
+        except Exception as ex:
+            status_text.show_error("Save failed", ex)
+
+    def items_to_download():
+        """Returns the selected items of the current mode, or all of them if none are selected."""
+        mode = loaded["mode"]
+        items = loaded["items"]
+        if selected[mode]:
+            items = [item for item in items if item['objectId'] in selected[mode]]
+        return mode, items
+
+    async def download_to_folder(e):
+        mode, items = items_to_download()
+        if not items:
+            status_text.show_status(f"No {mode} to download")
+            return
+        try:
+            directory = await ft.FilePicker().get_directory_path(dialog_title=f"Save {len(items)} {mode} to")
+        except Exception as ex:
+            status_text.show_error("Folder selection is not available here, download as ZIP instead", ex)
+            return
+        if not directory:
+            status_text.show_status("Download cancelled")
+            return
+
+        export_format = format_dropdown.value
+        extension = EXPORTERS[export_format].extension
+        used = {name.lower() for name in os.listdir(directory)}
+
+        def file_sink(path):
+            async def sink(job, data):
+                await asyncio.to_thread(Path(path).write_bytes, data)
+            return sink
+
+        for item in items:
+            path = os.path.join(directory, unique_filename(item.get('name', 'Unnamed'), mode, used, extension))
+            downloads.submit(item, mode, export_format, file_sink(path))
+        status_text.show_status(f"Downloading {len(items)} {mode} to {directory}")
+
+    async def download_as_zip(e):
+        mode, items = items_to_download()
+        if not items:
+            status_text.show_status(f"No {mode} to download")
+            return
+
+        export_format = format_dropdown.value
+        extension = EXPORTERS[export_format].extension
+        # Stream the archive into a temporary file so only the in-flight tracks are held in memory
+        tmp = tempfile.TemporaryFile()
+        archive = ArchiveWriter(tmp, "zip")
+        used = set()
+
+        def archive_sink(name):
+            async def sink(job, data):
+                await asyncio.to_thread(archive.add, name, data, item_datetime(job.item))
+            return sink
+
+        jobs = [downloads.submit(item, mode, export_format, archive_sink(unique_filename(item.get('name', 'Unnamed'), mode, used, extension)))
+                for item in items]
+        status_text.show_status(f"Downloading {len(items)} {mode} into a ZIP")
+        page.run_task(save_archive, jobs, archive, tmp, f"calimoto_{mode}.zip")
+
+    async def save_archive(jobs, archive, tmp, filename):
+        try:
+            for job in jobs:
+                await job.wait()
+            archive.close()
+            saved = sum(job.state == DONE for job in jobs)
+            if not saved:
+                status_text.show_status("Nothing downloaded, ZIP discarded")
+                return
+            tmp.seek(0)
+            archive_bytes = tmp.read()
+
+            status_text.show_status(f"Select location to save {filename}...")
+            path = await ft.FilePicker().save_file(
+                file_name=filename,
+                allowed_extensions=["zip"],
+                src_bytes=archive_bytes
+            )
+
+            if path:
+                message = f"Saved {saved} items to {path}"
+                if saved < len(jobs):
+                    status_text.show_error(message, f"{len(jobs) - saved} failed or cancelled")
+                else:
+                    status_text.show_status(message)
+            else:
+                status_text.show_status("Save cancelled")
         except Exception as ex:
             status_text.show_error("Download failed", ex)
-        page.update()
+        finally:
+            archive.close()
+            tmp.close()
 
     async def on_nav_change(e):
         mode = "routes" if e.control.selected_index == 0 else "tracks"
@@ -284,7 +648,7 @@ async def main(page: ft.Page):
 
     async def handle_refresh(e):
         mode = "routes" if nav_rail.selected_index == 0 else "tracks"
-        await load_items(mode)
+        await load_items(mode, refresh=True)
 
     nav_rail = ft.NavigationRail(
         selected_index=0,
@@ -318,6 +682,17 @@ async def main(page: ft.Page):
                             ft.Text("Dashboard", size=24, weight=ft.FontWeight.BOLD),
                             ft.Row(
                                 [
+                                    format_dropdown,
+                                    ft.IconButton(
+                                        icon=ft.Icons.DRIVE_FOLDER_UPLOAD,
+                                        tooltip="Download selected (or all) to a folder",
+                                        on_click=download_to_folder,
+                                    ),
+                                    ft.IconButton(
+                                        icon=ft.Icons.FOLDER_ZIP,
+                                        tooltip="Download selected (or all) as ZIP",
+                                        on_click=download_as_zip,
+                                    ),
                                     ft.IconButton(
                                         icon=ft.Icons.REFRESH,
                                         tooltip="Refresh list",
@@ -331,6 +706,7 @@ async def main(page: ft.Page):
                         alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
                     ),
                     status_text,
+                    downloads_panel,
                     items_list
                 ],
                 expand=True,
@@ -372,7 +748,7 @@ async def main(page: ft.Page):
         page.update()
         
         # Then load items
-        if not items_list.controls:
+        if not views:
             await load_items("routes")
         # Final update after loading
         page.update()
@@ -0,0 +1,114 @@
+import codecs
+import json
+import re
+from array import array
+
+
+class ArrayStreamParser:
+    """
+    Incrementally decodes the number array stored under `key` in a JSON blob such as {"speeds": [...]}.
+
+    Feed the body chunk by chunk with feed() and get the values from close(): an array('q') if
+    all values are integers, array('d') if they are numbers, else a list (like track.to_array).
+    With pairs=True the array holds [lat, lon] pairs and close() returns a lat and a lon
+    array('d'). Only the unparsed tail of the last chunk is buffered, so neither the raw body
+    nor a list of Python objects is ever held in full. Anything after the array is ignored.
+    """
+    def __init__(self, key, pairs=False):
+        self.key = key
+        self.pairs = pairs
+        self._start = re.compile(r'"' + re.escape(key) + r'"\s*:\s*\[')
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ""
+        self._found = False
+        self._done = False
+        if pairs:
+            self._lat = array('d')
+            self._lon = array('d')
+        else:
+            self._values = array('q')
+
+    def feed(self, data):
+        if self._done:
+            return
+        self._buffer += self._decoder.decode(data)
+        if not self._found:
+            match = self._start.search(self._buffer)
+            if not match:
+                # Keep enough characters to match a key split across chunks
+                self._buffer = self._buffer[-(len(self.key) + 64):]
+                return
+            self._found = True
+            self._buffer = self._buffer[match.end():]
+        self._parse()
+
+    def close(self):
+        """Returns the decoded values, raises ValueError if the array was cut off."""
+        self._buffer += self._decoder.decode(b"", final=True)
+        if self._found and not self._done:
+            self._parse()
+        if self._found and not self._done:
+            raise ValueError(f"Truncated {self.key} data received.")
+        return (self._lat, self._lon) if self.pairs else self._values
+
+    def _parse(self):
+        # Number arrays contain no strings, so all whitespace can go
+        text = "".join(self._buffer.split())
+        if self.pairs:
+            # Elements look like [lat,lon], the array ends with ]] (or a single ] when empty)
+            if text.startswith(']'):
+                end = 0
+            else:
+                end = text.find(']]')
+                end = end + 1 if end >= 0 else -1
+            separator, keep = '],', 1
+        else:
+            end = text.find(']')
+            separator, keep = ',', 0
+
+        if end >= 0:
+            complete, self._buffer, self._done = text[:end], "", True
+        else:
+            # Only parse up to the last complete element, the rest waits for the next chunk
+            cut = text.rfind(separator)
+            if cut < 0:
+                self._buffer = text
+                return
+            complete, self._buffer = text[:cut + keep], text[cut + len(separator):]
+        if complete:
+            if self.pairs:
+                self._add_pairs(complete)
+            else:
+                self._add_values(complete)
+
+    def _add_pairs(self, text):
+        count = text.count('[')
+        tokens = text.replace('[', '').replace(']', '').split(',')
+        if text.count(']') != count or len(tokens) != 2 * count:
+            raise ValueError("Invalid points data format received.")
+        try:
+            self._lat.extend(array('d', map(float, tokens[0::2])))
+            self._lon.extend(array('d', map(float, tokens[1::2])))
+        except ValueError:
+            raise ValueError("Invalid points data format received.")
+
+    def _add_values(self, text):
+        if isinstance(self._values, list):
+            self._values.extend(json.loads(f"[{text}]"))
+            return
+        tokens = text.split(',')
+        if self._values.typecode == 'q':
+            try:
+                self._values.extend(array('q', map(int, tokens)))
+                return
+            except (ValueError, OverflowError):
+                pass
+        try:
+            values = array('d', map(float, tokens))
+        except ValueError:
+            # Not purely numeric (e.g. null), keep everything as plain values
+            self._values = self._values.tolist() + json.loads(f"[{text}]")
+            return
+        if self._values.typecode == 'q':
+            self._values = array('d', self._values)
+        self._values.extend(values)
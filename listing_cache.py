@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+from calimoto_client import SUMMARY_KEYS
+
+
+class ListingCache:
+    """
+    Keeps the item listing of every mode in memory and brings it up to date with delta queries.
+
+    The first refresh() of a mode loads the full listing, newest items first. Later ones only
+    request rows with a newer updatedAt than any cached row and merge them in, plus a count
+    query that detects deleted rows, in which case the listing is loaded again in full.
+    """
+    def __init__(self, client, keys=SUMMARY_KEYS):
+        self.client = client
+        self.keys = keys
+        self._listings = {}
+
+    def get(self, mode):
+        """Returns the cached items of the mode (unsorted), or None if it was never loaded."""
+        listing = self._listings.get(mode)
+        return list(listing["items"].values()) if listing else None
+
+    def age(self, mode):
+        """Returns the seconds since the mode was last brought up to date, or None."""
+        listing = self._listings.get(mode)
+        return time.monotonic() - listing["checked"] if listing else None
+
+    def invalidate(self, mode=None):
+        if mode is None:
+            self._listings.clear()
+        else:
+            self._listings.pop(mode, None)
+
+    async def refresh(self, mode, full=False, on_page=None):
+        """
+        Brings the listing of the mode up to date, returns a tuple of (items, changed).
+
+        While a full listing loads, on_page(items) is called with the items received so far
+        after every page, so they can be shown before the last page arrives.
+        """
+        listing = self._listings.get(mode)
+        if listing is None or full:
+            items = []
+            async for page in self.client.iter_pages(mode, keys=self.keys, newest_first=True):
+                items.extend(page)
+                if on_page:
+                    on_page(items)
+            self._listings[mode] = {
+                "items": {item['objectId']: item for item in items},
+                "last_updated": max((item.get('updatedAt') or "" for item in items), default="") or None,
+                "checked": time.monotonic(),
+            }
+            return items, True
+
+        where = None
+        if listing["last_updated"]:
+            where = {"updatedAt": {"$gt": {"__type": "Date", "iso": listing["last_updated"]}}}
+        changes, count = await asyncio.gather(self.client.get_items(mode, where, keys=self.keys),
+                                              self.client.count_items(mode))
+        for item in changes:
+            listing["items"][item['objectId']] = item
+            updated_at = item.get('updatedAt')
+            if updated_at and (not listing["last_updated"] or updated_at > listing["last_updated"]):
+                listing["last_updated"] = updated_at
+        if count != len(listing["items"]):
+            # Rows were deleted (or created while the two queries ran), start over
+            return await self.refresh(mode, full=True, on_page=on_page)
+        listing["checked"] = time.monotonic()
+        return list(listing["items"].values()), bool(changes)
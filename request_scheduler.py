@@ -0,0 +1,114 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_AFTER_MAX = 300 # Never wait longer than this, even if the server asks to
+
+
+class RetryableStatusError(Exception):
+    """Raised by a send function that consumed a response with a retryable status itself (e.g. when streaming)."""
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+class RequestScheduler:
+    """
+    Runs requests with retries and an adaptive concurrency limit.
+
+    Transport errors, 429 and 5xx responses are retried with exponential backoff and full
+    jitter, or after the delay given by a Retry-After header. The number of requests in flight
+    is limited AIMD-style: every success raises the limit by 1/limit (about +1 per round of
+    requests), throttling or errors halve it, at most once per `cooldown` seconds.
+    """
+    def __init__(self, max_concurrency=32, min_concurrency=1, initial_concurrency=8,
+                 max_retries=5, backoff_base=0.5, backoff_max=30.0, cooldown=1.0):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(max(min_concurrency, min(initial_concurrency, max_concurrency)))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.retries = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    async def _acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def _release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def _on_success(self):
+        self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+    def _on_congestion(self):
+        now = time.monotonic()
+        if now - self._last_decrease >= self.cooldown:
+            self.limit = max(self.min_concurrency, self.limit / 2)
+            self._last_decrease = now
+
+    @staticmethod
+    def _retry_after(response):
+        """Returns the delay requested by a Retry-After header in seconds, or None."""
+        value = response.headers.get('Retry-After') if response is not None else None
+        if not value:
+            return None
+        try:
+            return min(RETRY_AFTER_MAX, max(0.0, float(value)))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return min(RETRY_AFTER_MAX, max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds()))
+        except Exception:
+            return None
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def request(self, send):
+        """
+        Calls `send()` (a coroutine function returning an httpx.Response) until it succeeds.
+
+        Returns the last response once retries are exhausted, so callers keep handling error
+        statuses themselves. Raises the last transport error if no response was received.
+        """
+        for attempt in range(self.max_retries + 1):
+            response = None
+            error = None
+            await self._acquire()
+            try:
+                response = await send()
+            except RetryableStatusError as e:
+                response = e.response
+                error = e
+            except httpx.TransportError as e:
+                error = e
+            finally:
+                await self._release()
+
+            if error is None and response.status_code not in RETRY_STATUSES:
+                self._on_success()
+                return response
+
+            self._on_congestion()
+            if attempt == self.max_retries:
+                if error is not None and not isinstance(error, RetryableStatusError):
+                    raise error
+                return response
+
+            self.retries += 1
+            delay = self._retry_after(response)
+            await asyncio.sleep(delay if delay is not None else self._backoff(attempt))
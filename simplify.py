@@ -0,0 +1,120 @@
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+EARTH_RADIUS = 6371008.8 # Mean earth radius in metres
+
+
+def _project(track):
+    """Projects the points onto a local plane in metres (equirectangular around the mean latitude)."""
+    if not len(track):
+        return [], []
+    scale = math.radians(1) * EARTH_RADIUS
+    lat0 = math.radians(sum(track.lat) / len(track))
+    x_scale = scale * math.cos(lat0)
+    if np is not None:
+        return np.frombuffer(track.lon, dtype=np.float64) * x_scale, np.frombuffer(track.lat, dtype=np.float64) * scale
+    return [lon * x_scale for lon in track.lon], [lat * scale for lat in track.lat]
+
+
+def _simplify_numpy(xs, ys, tolerance, keep):
+    """
+    Runs Douglas-Peucker on all open segments of one recursion level at once.
+
+    Every level is a handful of vectorized passes over at most n points, so the cost is
+    O(n log n) for typical tracks without a Python-level loop per segment.
+    """
+    firsts = np.array([0], dtype=np.int64)
+    lasts = np.array([len(xs) - 1], dtype=np.int64)
+    while len(firsts):
+        lengths = lasts - firsts - 1
+        offsets = np.cumsum(lengths) - lengths
+        segment = np.repeat(np.arange(len(firsts)), lengths)
+        indices = np.arange(len(segment)) - offsets[segment] + firsts[segment] + 1
+
+        ax, ay = xs[firsts][segment], ys[firsts][segment]
+        dx, dy = xs[lasts][segment] - ax, ys[lasts][segment] - ay
+        px, py = xs[indices] - ax, ys[indices] - ay
+        length = dx * dx + dy * dy
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(length > 0, np.clip((px * dx + py * dy) / length, 0.0, 1.0), 0.0)
+        distances = np.hypot(px - t * dx, py - t * dy)
+
+        # First point with the maximum distance of every segment
+        maximum = np.maximum.reduceat(distances, offsets)
+        candidates = np.flatnonzero(distances == maximum[segment])
+        candidates = candidates[np.r_[True, segment[candidates[1:]] != segment[candidates[:-1]]]]
+
+        split = maximum > tolerance
+        chosen = indices[candidates][split]
+        keep[chosen] = 1
+        firsts = np.concatenate((firsts[split], chosen))
+        lasts = np.concatenate((chosen, lasts[split]))
+        # Segments without interior points are done
+        open_segments = lasts - firsts > 1
+        firsts, lasts = firsts[open_segments], lasts[open_segments]
+
+
+def _farthest(xs, ys, first, last):
+    """Returns (index, distance) of the point between first and last farthest from segment first-last."""
+    ax, ay = xs[first], ys[first]
+    dx, dy = xs[last] - ax, ys[last] - ay
+    length = dx * dx + dy * dy
+    best_index, best_distance = first, -1.0
+    for i in range(first + 1, last):
+        px, py = xs[i] - ax, ys[i] - ay
+        if length:
+            t = min(1.0, max(0.0, (px * dx + py * dy) / length))
+            px -= t * dx
+            py -= t * dy
+        distance = px * px + py * py
+        if distance > best_distance:
+            best_index, best_distance = i, distance
+    return best_index, math.sqrt(best_distance)
+
+
+def simplify_indices(track, tolerance):
+    """
+    Returns the ascending indices of the points kept by Douglas-Peucker with `tolerance` metres.
+
+    Every dropped point lies within `tolerance` of the simplified line. With NumPy all segments
+    of a level are split in one vectorized pass, otherwise they are processed with an explicit
+    stack, so million-point tracks never hit the recursion limit.
+    """
+    count = len(track)
+    if count < 3 or tolerance <= 0:
+        return list(range(count))
+
+    xs, ys = _project(track)
+    if np is not None:
+        keep = np.zeros(count, dtype=np.uint8)
+        keep[0] = keep[count - 1] = 1
+        _simplify_numpy(xs, ys, tolerance, keep)
+        return np.flatnonzero(keep).tolist()
+
+    keep = bytearray(count)
+    keep[0] = keep[count - 1] = 1
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        index, distance = _farthest(xs, ys, first, last)
+        if distance > tolerance:
+            keep[index] = 1
+            stack.append((first, index))
+            stack.append((index, last))
+    return [i for i, kept in enumerate(keep) if kept]
+
+
+def simplify_track(track, tolerance):
+    """Returns a simplified copy of the Track, altitude/time/speed samples follow their points."""
+    if not tolerance:
+        return track
+    indices = simplify_indices(track, tolerance)
+    if len(indices) == len(track):
+        return track
+    return track.subset(indices)
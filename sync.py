@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+
+from calimoto_client import EXPORT_KEYS
+from bulk_export import export_items, unique_filename
+
+MANIFEST_FILE = '.calimoto_manifest.json'
+BLOB_KEYS = ["points", "altitudes", "dates", "speeds"]
+
+
+def load_manifest(path):
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except Exception:
+            pass # Unreadable manifest, start a full sync
+    return {}
+
+
+def save_manifest(path, manifest):
+    # Write to a temporary file first so an interrupted sync never leaves a truncated manifest
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def content_fingerprint(item, tolerance=None):
+    """Identifies the exported content: the name, the (immutable) Parse file URLs of the blobs and the simplification."""
+    urls = [item.get(key, {}).get('url') or "" for key in BLOB_KEYS]
+    # The tolerance is only added when set, so manifests of unsimplified syncs stay valid
+    extra = [tolerance] if tolerance else []
+    return hashlib.sha256(json.dumps([item.get('name', 'Unnamed')] + urls + extra).encode('utf-8')).hexdigest()
+
+
+async def sync_items(client, mode, out_dir=".", jobs=4, on_progress=None, executor=None, tolerance=None,
+                     export_format="gpx"):
+    """
+    Exports only the items that were created or changed since the last sync into out_dir.
+
+    A manifest in out_dir records objectId, updatedAt, content fingerprint, file hash and output
+    path per item, separately for every export format. Only rows with a newer updatedAt than the last successful sync are listed,
+    rows whose blobs did not change are skipped without downloading them, and files are only
+    rewritten when their content differs. Changing the simplification `tolerance` re-exports
+    every item.
+    Returns a tuple of (saved_paths, skipped_count, failures).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+    manifest = load_manifest(manifest_path)
+    # GPX keeps the plain mode as key, so manifests from before other formats existed stay valid
+    key = mode if export_format == "gpx" else f"{mode}.{export_format}"
+    state = manifest.setdefault(key, {"last_updated": None, "items": {}})
+    entries = state["items"]
+
+    where = None
+    # A different simplification changes every file, so all rows are listed again
+    if state["last_updated"] and state.get("tolerance") == tolerance:
+        where = {"updatedAt": {"$gt": {"__type": "Date", "iso": state["last_updated"]}}}
+
+    last_updated = state["last_updated"]
+    skipped = 0
+    # Names already taken by files of earlier syncs
+    reserved = {entry['path'].lower() for entry in entries.values()}
+
+    async def changed_items():
+        nonlocal last_updated, skipped
+        async for item in client.iter_items(mode, where, keys=EXPORT_KEYS):
+            updated_at = item.get('updatedAt')
+            if updated_at and (not last_updated or updated_at > last_updated):
+                last_updated = updated_at
+            entry = entries.get(item['objectId'])
+            if entry and entry.get('fingerprint') == content_fingerprint(item, tolerance) \
+                    and os.path.exists(os.path.join(out_dir, entry['path'])):
+                entry['updatedAt'] = updated_at
+                skipped += 1
+                continue
+            yield item
+
+    def path_for(item, used, extension):
+        entry = entries.get(item['objectId'])
+        if entry:
+            return os.path.join(out_dir, entry['path'])
+        if not used:
+            used.update(reserved)
+        return os.path.join(out_dir, unique_filename(item.get('name', 'Unnamed'), mode, used, extension))
+
+    async def save(client, item, mode, path, writer):
+        data = await writer.encode(await client.get_track(item, mode))
+        digest = hashlib.sha256(data).hexdigest()
+        entry = entries.get(item['objectId'])
+        if not (entry and entry.get('sha256') == digest and os.path.exists(path)):
+            with open(path, 'wb') as f:
+                f.write(data)
+        entries[item['objectId']] = {
+            "updatedAt": item.get('updatedAt'),
+            "fingerprint": content_fingerprint(item, tolerance),
+            "sha256": digest,
+            "path": os.path.relpath(path, out_dir),
+        }
+
+    try:
+        saved, failures = await export_items(client, changed_items(), mode, out_dir, jobs, on_progress,
+                                             path_for=path_for, save=save, executor=executor,
+                                             tolerance=tolerance, export_format=export_format)
+        # Failed items must be listed again next time, so only advance the cursor on full success
+        if not failures:
+            state["last_updated"] = last_updated
+            state["tolerance"] = tolerance
+    finally:
+        save_manifest(manifest_path, manifest)
+
+    return saved, skipped, failures
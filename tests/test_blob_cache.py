@@ -0,0 +1,24 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blob_cache import BlobCache
+
+
+def test_concurrent_put_with_eviction(tmp_path):
+    # Writers racing with each other's eviction scans must neither fail nor leave files behind
+    cache = BlobCache(str(tmp_path), max_bytes=200_000)
+    content = os.urandom(4096)
+
+    def put(index):
+        cache.put(f"https://example.com/files/{index}", content)
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(put, range(3000)))
+
+    names = os.listdir(tmp_path)
+    assert not [name for name in names if name.endswith('.tmp')]
+    assert sum(os.path.getsize(tmp_path / name) for name in names) <= cache.max_bytes
+    assert cache.get("https://example.com/files/2999") == content
@@ -0,0 +1,68 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from download_manager import CANCELLED, DONE, DownloadManager
+from track import Track
+
+
+class FakeClient:
+    """Returns a small Track for every item after `delay` seconds."""
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.started = []
+
+    async def get_track(self, item, mode, on_progress=None):
+        self.started.append(item['objectId'])
+        await asyncio.sleep(self.delay)
+        return Track(item['name'], [48.1, 48.2], [11.5, 11.6])
+
+
+def make_items(count):
+    return [{'objectId': f"R{index}", 'name': f"Route {index}"} for index in range(count)]
+
+
+def test_cancel_all_right_after_submit():
+    # The tasks of the first jobs exist but have not run yet when they are cancelled
+    async def run():
+        manager = DownloadManager(FakeClient(), concurrency=2)
+        jobs = [manager.submit(item, "routes") for item in make_items(4)]
+        manager.cancel_all()
+        await asyncio.wait_for(asyncio.gather(*(job.wait() for job in jobs)), timeout=1)
+        return manager, jobs
+
+    manager, jobs = asyncio.run(run())
+    assert [job.state for job in jobs] == [CANCELLED] * 4
+    assert manager.active == 0
+
+
+def test_cancel_before_start_frees_the_slot():
+    async def run():
+        client = FakeClient()
+        manager = DownloadManager(client, concurrency=1)
+        first, second = [manager.submit(item, "routes") for item in make_items(2)]
+        manager.cancel(first)
+        await asyncio.wait_for(asyncio.gather(first.wait(), second.wait()), timeout=1)
+        return client, manager, first, second
+
+    client, manager, first, second = asyncio.run(run())
+    assert first.state == CANCELLED
+    assert second.state == DONE and second.data.startswith(b"<?xml")
+    assert client.started == ["R1"]
+    assert manager.active == 0
+
+
+def test_cancel_while_downloading():
+    async def run():
+        manager = DownloadManager(FakeClient(delay=10), concurrency=2)
+        job = manager.submit(make_items(1)[0], "routes")
+        await asyncio.sleep(0.01)
+        manager.cancel(job)
+        await asyncio.wait_for(job.wait(), timeout=1)
+        return manager, job
+
+    manager, job = asyncio.run(run())
+    assert job.state == CANCELLED
+    assert manager.active == 0
@@ -0,0 +1,80 @@
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def to_array(values):
+    """Packs a number sequence into a compact array: 'q' if all values are integers, else 'd'."""
+    if isinstance(values, array):
+        return values
+    try:
+        return array('q', values)
+    except TypeError:
+        pass
+    try:
+        return array('d', values)
+    except TypeError:
+        return list(values) # Not purely numeric, keep as is
+
+
+def is_float_array(values, count):
+    """True if values can be used as a lat/lon column as is: an array('d') of exactly count items."""
+    return isinstance(values, array) and values.typecode == 'd' and len(values) == count
+
+
+class Track:
+    """
+    A route or recorded track stored as one compact array per sample column.
+
+    lat and lon (degrees) are array('d'). ele (metres), time (millisecond offsets from
+    start_date) and speed (m/s) are array('q') or array('d') and may be empty or shorter than
+    the points, in which case only the leading points carry that value. Columns longer than the
+    points are cut, so every column index refers to the same point.
+    """
+    __slots__ = ('name', 'start_date', 'lat', 'lon', 'ele', 'time', 'speed')
+
+    def __init__(self, name, lat, lon, ele=(), time=(), speed=(), start_date=None):
+        count = min(len(lat), len(lon))
+        self.name = name
+        self.start_date = start_date
+        self.lat = lat if is_float_array(lat, count) else array('d', lat[:count])
+        self.lon = lon if is_float_array(lon, count) else array('d', lon[:count])
+        self.ele = to_array(ele[:count]) if ele else array('d')
+        self.time = to_array(time[:count]) if time else array('q')
+        self.speed = to_array(speed[:count]) if speed else array('d')
+
+    @classmethod
+    def from_points(cls, points, name, altitudes=None, timestamps=None, speeds=None, start_date=None):
+        """Builds a Track from [[lat, lon], ...] and the optional per-point lists."""
+        return cls(name, [point[0] for point in points], [point[1] for point in points],
+                   altitudes or (), timestamps or (), speeds or (), start_date)
+
+    def __len__(self):
+        return len(self.lat)
+
+    def __repr__(self):
+        return f"Track({self.name!r}, {len(self)} points)"
+
+    def subset(self, indices):
+        """Returns a new Track with only the points at the given (ascending) indices."""
+        def pick(column):
+            picked = [column[i] for i in indices if i < len(column)]
+            return array(column.typecode, picked) if isinstance(column, array) else picked
+        return Track(self.name, pick(self.lat), pick(self.lon), pick(self.ele), pick(self.time),
+                     pick(self.speed), self.start_date)
+
+    def to_numpy(self):
+        """Returns the columns as NumPy arrays sharing memory with the track (requires NumPy)."""
+        if np is None:
+            raise ImportError("NumPy is required for Track.to_numpy()")
+        columns = {}
+        for column in ('lat', 'lon', 'ele', 'time', 'speed'):
+            values = getattr(self, column)
+            if isinstance(values, array):
+                columns[column] = np.frombuffer(values, dtype=np.int64 if values.typecode == 'q' else np.float64)
+            else:
+                columns[column] = np.asarray(values, dtype=np.float64)
+        return columns